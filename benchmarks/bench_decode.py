@@ -0,0 +1,64 @@
+# bench_decode.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Board json decoding: previous object_hook decoder vs the schema loader,
+# on a parsed document and streamed task by task as load_board does
+import json
+import tempfile
+
+from common import import_kanban, timeit, make_board
+
+import_kanban()
+from kanban.Board import Board
+from kanban.Task import Task
+from kanban.json_storage import BoardEncoder, decodeBoard, stream_board
+import legacy_model
+
+
+def main(tasks=100000):
+    board = make_board(Board, Task, "bench", 4, tasks)
+    data = json.dumps(board, cls=BoardEncoder)
+    before = timeit(lambda: json.JSONDecoder(object_hook=legacy_model.decodeBoard).decode(data))
+    after = timeit(lambda: decodeBoard(json.loads(data)))
+    with tempfile.NamedTemporaryFile("w+", suffix=".json") as f:
+        f.write(data)
+        f.flush()
+
+        def stream():
+            with open(f.name, "r") as g:
+                return stream_board(g)
+        streamed = timeit(stream)
+    scale = 100000 / tasks
+    print("decode %d tasks (%.1f MB)" % (tasks, len(data) / 1e6))
+    print("  object_hook: %7.1f ms per 100k tasks" % (before * scale * 1000))
+    print("  schema:      %7.1f ms per 100k tasks" % (after * scale * 1000))
+    print("  streamed:    %7.1f ms per 100k tasks" % (streamed * scale * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# bench_memory.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Memory held by a decoded board: plain attribute objects vs compact tasks
+import io
+import gc
+import json
+import tracemalloc
+
+from common import import_kanban, make_board
+
+import_kanban()
+from kanban.Board import Board
+from kanban.Task import Task
+from kanban.json_storage import BoardEncoder, stream_board
+import legacy_model
+
+LABELS = [{"name": "bug", "color": "red"}, {"name": "feature", "color": "green"}]
+
+
+def measure(func):
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def main(tasks=100000, imported_every=20):
+    board = make_board(Board, Task, "bench", 4, tasks)
+    for l in board.tasklists:
+        for i, t in enumerate(l.tasks):
+            if i % imported_every == 0:
+                t.set_field("description", "Imported card %d" % i)
+                t.set_field("labels", json.loads(json.dumps(LABELS)))
+    data = json.dumps(board, cls=BoardEncoder)
+    del board
+
+    # Created beforehand, like the file read by load_board
+    f = io.StringIO(data)
+
+    def compact():
+        board, version = stream_board(f)
+        # The legacy model has no task id index, it is measured on its own
+        board._index = dict()
+        return board
+
+    runs = [("__dict__ objects", lambda: json.JSONDecoder(
+                object_hook=legacy_model.decodeBoard).decode(data)),
+            ("compact tasks", compact)]
+    print("%d tasks, 1 in %d with imported fields" % (tasks, imported_every))
+    retained = []
+    for name, func in runs:
+        result, current, peak = measure(func)
+        retained.append(current)
+        print("  %-16s retained %6.1f MB (%3d B/task), peak %6.1f MB" % (
+            name, current / 1e6, current / tasks, peak / 1e6))
+    _, current, _ = measure(result.rebuild_index)
+    print("  %-16s retained %6.1f MB (%3d B/task)" % (
+        "id index", current / 1e6, current / tasks))
+    # What a loaded board costs, next to the legacy model which has no index
+    total = retained[1] + current
+    print("  %-16s retained %6.1f MB (%3d B/task), %+.0f%% vs __dict__ objects" % (
+        "compact + index", total / 1e6, total / tasks, 100 * (total / retained[0] - 1)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# bench_moves.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Random task moves within one large list: cost of the move itself and of
+# persisting it. Before order keys a move was a remove + insert and the
+# whole board was written again; now it is one journal record or one row.
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from common import import_kanban, make_board, quiet
+
+import_kanban()
+from kanban.Board import Board
+from kanban.Task import Task
+from kanban.json_storage import JsonStorage
+from kanban.sqlite_storage import SqliteStorage
+
+
+def random_moves(count, size, seed=1):
+    rnd = random.Random(seed)
+    return [(rnd.randrange(size), rnd.randrange(size)) for i in range(count)]
+
+
+def save(storage, board, stats):
+    stats["rebalances"] += sum(1 for c in board.pending_changes() if c["op"] == "rebalance")
+    with quiet():
+        storage.save_board(board)
+    board.mark_saved()
+
+
+def run(storage, board, moves, save_every):
+    tasklist = board.tasklists[0]
+    stats = {"rebalances": 0}
+    save(storage, board, stats)
+    start = time.perf_counter()
+    for i, (index, new_index) in enumerate(moves):
+        tasklist.move(index, new_index)
+        if i % save_every == save_every - 1:
+            save(storage, board, stats)
+    save(storage, board, stats)
+    stats["elapsed"] = time.perf_counter() - start
+    keys = [len(t.order) for t in tasklist.tasks]
+    stats["longest"] = max(keys)
+    stats["average"] = sum(keys) / len(keys)
+    return stats
+
+
+def main(tasks=50000, count=10000, save_every=100):
+    root = tempfile.mkdtemp(prefix="kanban-bench-")
+    print("random moves in a list of %d tasks, saved every %d moves" % (tasks, save_every))
+    try:
+        # Rewriting the whole board is too slow for the full run
+        for name, storage, moves in (
+                ("snapshot", JsonStorage(os.path.join(root, "snapshot") + "/"), count // 10),
+                ("journal", JsonStorage(os.path.join(root, "journal") + "/", journal=True), count),
+                ("sqlite", SqliteStorage(os.path.join(root, "sqlite") + "/"), count)):
+            os.makedirs(storage.config_dir)
+            board = make_board(Board, Task, "bench", 1, tasks)
+            stats = run(storage, board, random_moves(moves, tasks), save_every)
+            print("  %-8s %5d moves %8.1f ms %8.1f us/move  key length max %d avg %.1f, %d rebalances" % (
+                name, moves, stats["elapsed"] * 1000, stats["elapsed"] / moves * 1e6,
+                stats["longest"], stats["average"], stats["rebalances"]))
+    finally:
+        shutil.rmtree(root, True)
+
+
+if __name__ == "__main__":
+    main()
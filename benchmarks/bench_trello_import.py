@@ -0,0 +1,96 @@
+# bench_trello_import.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Trello import of a large synthetic export: loading the whole document
+# with json.load vs streaming only its lists and cards
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from common import import_kanban, write_export
+
+import_kanban()
+from kanban.Board import Board
+from kanban.settings import KanbanSettings
+from kanban.json_storage import JsonStorage
+from kanban.trello_importer import import_data, card_to_task
+
+
+def load_whole(path):
+    # What import_data did before: the whole document in memory
+    board = Board("Work")
+    with open(path, "r") as f:
+        data = json.load(f)
+    lists = dict()
+    for l in data["lists"]:
+        lists[l["id"]] = board.add_new(l["name"])
+    for card in data["cards"]:
+        if not card["closed"]:
+            lists[card["idList"]].add(card_to_task(card))
+    return board
+
+
+def stream(path):
+    settings = KanbanSettings(os.path.dirname(path) + "/", JsonStorage(os.path.dirname(path) + "/"))
+    settings.add_board(Board("Work"))
+    import_data(settings, path)
+    return settings.boards["Work"]
+
+
+def measure(func, path):
+    start = time.perf_counter()
+    board = func(path)
+    elapsed = time.perf_counter() - start
+    tasks = sum(len(l.tasks) for l in board.tasklists)
+    del board
+    tracemalloc.start()
+    board = func(path)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, current, tasks
+
+
+def main(cards=20000):
+    root = tempfile.mkdtemp(prefix="kanban-bench-")
+    try:
+        path = os.path.join(root, "export.json")
+        write_export(path, cards)
+        print("import %d cards from a %.1f MB export" % (cards, os.path.getsize(path) / 1e6))
+        for name, func in (("json.load", load_whole), ("streaming", stream)):
+            elapsed, peak, current, tasks = measure(func, path)
+            print("  %-10s %8.1f ms  peak %7.1f MB  board %6.1f MB  %d tasks" % (
+                name, elapsed * 1000, peak / 1e6, current / 1e6, tasks))
+    finally:
+        shutil.rmtree(root, True)
+
+
+if __name__ == "__main__":
+    main()
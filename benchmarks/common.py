@@ -0,0 +1,107 @@
+# common.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import io
+import os
+import sys
+import json
+import random
+import atexit
+import contextlib
+import shutil
+import tempfile
+import time
+
+
+# meson installs every source file into a single 'kanban' package directory;
+# mirror that layout so the modules' relative imports resolve
+def import_kanban():
+    src = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+    root = tempfile.mkdtemp(prefix="kanban-bench-")
+    atexit.register(shutil.rmtree, root, True)
+    package = os.path.join(root, "kanban")
+    os.mkdir(package)
+    for dirpath, dirnames, filenames in os.walk(os.path.abspath(src)):
+        for filename in filenames:
+            if filename.endswith(".py"):
+                os.symlink(os.path.join(dirpath, filename),
+                           os.path.join(package, filename))
+    sys.path.insert(0, root)
+
+
+def quiet():
+    # The storage backends log every file they read and write
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def timeit(func, repeat=3):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def make_board(Board, Task, title, lists, tasks, due_every=10):
+    board = Board(title)
+    for i in range(lists):
+        tasklist = board.add_new("List %d" % i)
+        for j in range(tasks // lists):
+            task = Task("Task %d of list %d" % (j, i))
+            if j % due_every == 0:
+                task.set_due_date(2030, 1 + j % 12, 1 + j % 28)
+            tasklist.add(task)
+    board.mark_saved()
+    return board
+
+
+def write_export(path, cards, lists=10, actions_per_card=10, seed=1):
+    # Written piece by piece, the export itself would not fit the budget
+    rnd = random.Random(seed)
+    with open(path, "w") as f:
+        f.write('{"id": "board", "name": "Bench", "actions": [')
+        for i in range(cards * actions_per_card):
+            action = {"id": "%024x" % i, "type": "updateCard",
+                      "date": "2018-01-01T00:00:00.000Z",
+                      "data": {"text": "comment %d " % i * rnd.randrange(1, 8),
+                               "card": {"id": "%024x" % (i // actions_per_card)}},
+                      "memberCreator": {"id": "m1", "fullName": "Member"}}
+            f.write(("," if i else "") + json.dumps(action))
+        f.write('], "cards": [')
+        for i in range(cards):
+            card = {"id": "%024x" % i, "name": "Card %d" % i, "desc": "desc %d" % i,
+                    "closed": i % 20 == 0, "idList": "list%d" % (i % lists),
+                    "due": None, "labels": [{"name": "label %d" % (i % 5), "color": "green"}]}
+            f.write(("," if i else "") + json.dumps(card))
+        f.write('], "lists": [')
+        f.write(",".join(json.dumps({"id": "list%d" % i, "name": "List %d" % i})
+                         for i in range(lists)))
+        f.write('], "checklists": [], "members": []}')
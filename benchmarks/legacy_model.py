@@ -0,0 +1,80 @@
+# legacy_model.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Model and decoder as they were before the storage optimizations, kept as
+# the "before" side of the benchmarks
+from datetime import datetime
+
+
+class DueDate:
+
+    def __init__(self, year, month, day):
+        self.year = year
+        self.month = month
+        self.day = day
+
+
+class Task:
+
+    def __init__(self, title):
+        self.title = title
+        self.creation_date = datetime.now().timestamp()
+        self.update_date = self.creation_date
+        self.due_date = None
+
+
+class TaskList:
+
+    def __init__(self, title):
+        self.title = title
+        self.tasks = []
+
+
+class Board:
+
+    def __init__(self, title):
+        self.title = title
+        self.tasklists = []
+
+
+def decodeBoard(d):
+    o = None
+    if 'day' in d:
+        o = DueDate(0, 0, 0)
+    elif not 'title' in d:
+        return o
+
+    if 'creation_date' in d:
+        o = Task(d['title'])
+    if 'tasks' in d:
+        o = TaskList(d['title'])
+    if 'tasklists' in d:
+        o = Board(d['title'])
+    for p in d:
+        setattr(o, p, d[p])
+    return o
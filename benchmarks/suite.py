@@ -0,0 +1,295 @@
+# suite.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Benchmark suite of the model and the persistence on synthetic configs of
+# 1 to 100 boards and 10 to 200k tasks. Every benchmark reports its best
+# time and its memory peak, which are compared with a stored baseline:
+#
+#   python3 suite.py                  run and compare with baseline.json
+#   python3 suite.py --save-baseline  run and store the results
+#   python3 suite.py --quick          skip the largest configs
+#
+# Exits with status 1 if a result is worse than the baseline by more than
+# the threshold. Timings depend on the machine, save a baseline on the one
+# running the comparisons.
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import import_kanban, quiet, write_export
+
+import_kanban()
+from kanban.Board import Board
+from kanban.Task import Task
+from kanban.settings import KanbanSettings
+from kanban.json_storage import JsonStorage, BoardEncoder, decodeBoard
+from kanban.sqlite_storage import SqliteStorage
+from kanban.trello_importer import import_data
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# name, boards, tasks per board, lists per board, quick
+CONFIGS = [("1x10", 1, 10, 4, True),
+           ("10x2k", 10, 2000, 4, True),
+           ("100x2k", 100, 2000, 4, False),
+           ("1x200k", 1, 200000, 4, False)]
+# Differences below these are noise whatever their ratio
+MIN_TIME = 0.002
+MIN_MEMORY = 256 * 1024
+OPERATIONS = 1000
+TRELLO_CARDS = 20000
+
+
+def fill_board(title, tasks, lists, rnd):
+    # Built directly, adding tasks one by one would record a change each
+    board = Board(title)
+    for i in range(lists):
+        tasklist = board.add_new("List %d" % i)
+        for j in range(tasks // lists):
+            task = Task("Task %d of list %d" % (j, i))
+            if rnd.randrange(5) == 0:
+                task._due = 737000 + rnd.randrange(1000)
+            task._tasklist = tasklist
+            tasklist.tasks.append(task)
+        tasklist.spread_keys()
+    board.rebuild_index()
+    board.mark_saved()
+    return board
+
+
+class Config:
+
+    def __init__(self, name, boards, tasks, lists):
+        self.name = name
+        self.root = tempfile.mkdtemp(prefix="kanban-bench-")
+        self.json_dir = os.path.join(self.root, "json") + "/"
+        self.sqlite_dir = os.path.join(self.root, "sqlite") + "/"
+        rnd = random.Random(1)
+        self.boards = [fill_board("Board %d" % i, tasks, lists, rnd) for i in range(boards)]
+        self.tasks = boards * tasks
+        with quiet():
+            json_storage = JsonStorage(self.json_dir)
+            sqlite_storage = SqliteStorage(self.sqlite_dir)
+            for b in self.boards:
+                json_storage.save_board(b)
+                sqlite_storage.save_board(b)
+            sqlite_storage.close()
+
+    def close(self):
+        shutil.rmtree(self.root, True)
+
+    def settings(self, storage):
+        with quiet():
+            settings = KanbanSettings(storage.config_dir, storage)
+            settings.load()
+        return settings
+
+    # Every benchmark returns the function to measure, its preparation is
+    # not measured
+
+    def load_json(self):
+        return lambda: self.settings(JsonStorage(self.json_dir))
+
+    def load_sqlite(self):
+        def run():
+            storage = SqliteStorage(self.sqlite_dir)
+            self.settings(storage)
+            storage.close()
+        return run
+
+    def save_snapshot(self):
+        # Every board written again as a whole
+        settings = self.settings(JsonStorage(self.json_dir))
+        for b in settings.boards.values():
+            b.touch()
+
+        def run():
+            with quiet():
+                settings.save()
+        return run
+
+    def save_journal(self):
+        # One changed task per board, appended to the journals
+        storage = JsonStorage(self.json_dir, journal=True)
+        settings = self.settings(storage)
+
+        def run():
+            for b in settings.boards.values():
+                b.tasklists[0].tasks[0].set_title("changed")
+            with quiet():
+                settings.save()
+        return run
+
+    def save_sqlite(self):
+        storage = SqliteStorage(self.sqlite_dir)
+        settings = self.settings(storage)
+
+        def run():
+            for b in settings.boards.values():
+                b.tasklists[0].tasks[0].set_title("changed")
+            with quiet():
+                settings.save()
+        return run
+
+    def encode(self):
+        return lambda: [json.dumps(b, cls=BoardEncoder) for b in self.boards]
+
+    def decode(self):
+        data = [json.dumps(b, cls=BoardEncoder) for b in self.boards]
+        return lambda: [decodeBoard(json.loads(d)) for d in data]
+
+    def insert_remove(self):
+        # Random inserts into and removals from the first list
+        tasklist = self.boards[0].tasklists[0]
+        rnd = random.Random(2)
+
+        def run():
+            for i in range(OPERATIONS):
+                tasklist.insert(rnd.randrange(len(tasklist.tasks) + 1), Task("new"))
+            for i in range(OPERATIONS):
+                tasklist.remove(rnd.randrange(len(tasklist.tasks)))
+            self.boards[0].mark_saved()
+        return run
+
+    def trello_import(self):
+        cards = min(self.tasks, TRELLO_CARDS)
+        path = os.path.join(self.root, "export-%d.json" % cards)
+        if not os.path.exists(path):
+            write_export(path, cards)
+        import_dir = os.path.join(self.root, "import") + "/"
+
+        def run():
+            settings = KanbanSettings(import_dir, JsonStorage(import_dir))
+            settings.add_board(Board("Work"))
+            with quiet():
+                import_data(settings, path)
+        return run
+
+
+BENCHMARKS = ["load_json", "load_sqlite", "save_snapshot", "save_journal",
+              "save_sqlite", "encode", "decode", "insert_remove", "trello_import"]
+
+
+def measure(prepare, repeat):
+    best = None
+    for i in range(repeat):
+        run = prepare()
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    # Only what the measured function allocates counts for its peak
+    run = prepare()
+    gc.collect()
+    tracemalloc.start()
+    run()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"time": best, "peak": peak}
+
+
+def compare(result, base, threshold):
+    # Returns the names of the measures which regressed
+    regressions = []
+    if result["time"] > base["time"] * (1 + threshold) and \
+            result["time"] - base["time"] > MIN_TIME:
+        regressions.append("time")
+    if result["peak"] > base["peak"] * (1 + threshold) and \
+            result["peak"] - base["peak"] > MIN_MEMORY:
+        regressions.append("peak")
+    return regressions
+
+
+def change(value, base):
+    if base is None or base == 0:
+        return ""
+    return "%+5.0f%%" % (100 * (value - base) / base)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model and persistence benchmarks")
+    parser.add_argument("--quick", action="store_true", help="skip the largest configs")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="relative slowdown or memory growth reported as a regression")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, metavar="BENCHMARK")
+    args = parser.parse_args()
+
+    baseline = dict()
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    results = dict()
+    regressions = 0
+    print("%-8s %-14s %10s %7s %10s %7s" % ("config", "benchmark", "ms", "", "peak MB", ""))
+    for name, boards, tasks, lists, quick in CONFIGS:
+        if args.quick and not quick:
+            continue
+        config = Config(name, boards, tasks, lists)
+        results[name] = dict()
+        try:
+            for bench in args.only or BENCHMARKS:
+                result = measure(getattr(config, bench), args.repeat)
+                results[name][bench] = result
+                base = baseline.get(name, {}).get(bench)
+                flags = [] if base is None else compare(result, base, args.threshold)
+                regressions += len(flags)
+                print("%-8s %-14s %10.1f %7s %10.1f %7s %s" % (
+                    name, bench, result["time"] * 1000,
+                    change(result["time"], base and base["time"]),
+                    result["peak"] / 1e6, change(result["peak"], base and base["peak"]),
+                    " ".join("REGRESSION(%s)" % f for f in flags)))
+                sys.stdout.flush()
+        finally:
+            config.close()
+
+    if args.save_baseline:
+        # Configs and benchmarks which were not run keep their values
+        for name, benches in results.items():
+            baseline.setdefault(name, dict()).update(benches)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        print("baseline saved to", args.baseline)
+    elif regressions > 0:
+        print("%d regressions over %d%%" % (regressions, args.threshold * 100))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+# cli.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Headless entry point, run as "kanban --cli <command>". It imports the
+# model and the storage backends only, never gi, so scripts (cron jobs,
+# shell pipelines) start quickly and do not need a display.
+
+import os
+import sys
+import json
+import argparse
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+
+from .settings import KanbanSettings, create_storage, CONFIG_DIR
+from .json_storage import BoardEncoder
+
+
+class CliError(Exception):
+    pass
+
+
+def stored_backends(config_dir):
+    # Backends which hold boards in config_dir
+    backends = []
+    if os.path.exists(config_dir + "kanban.db"):
+        backends.append("sqlite")
+    if os.path.isdir(config_dir) and any(
+            os.path.splitext(f)[1] in (".json", ".pkl") for f in os.listdir(config_dir)):
+        backends.append("json")
+    return backends
+
+
+def open_settings(config_dir, storage):
+    # The app chooses the backend in GSettings, which needs gi, and moves
+    # the json boards into kanban.db when it is switched to sqlite. The CLI
+    # never migrates, it only opens the backend the boards are stored in.
+    stored = stored_backends(config_dir)
+    if storage is None:
+        if len(stored) > 1:
+            raise CliError("boards are stored both as json files and in kanban.db, "
+                           "choose one with --storage")
+        storage = stored[0] if len(stored) > 0 else "json"
+    elif len(stored) == 1 and storage not in stored:
+        raise CliError("boards are stored with the %s backend, not %s" % (stored[0], storage))
+    settings = KanbanSettings(config_dir, create_storage(storage, config_dir), lazy=True)
+    # The example board of the app is not saved, its task ids would change
+    # on every run
+    settings.load(default=False)
+    return settings
+
+
+def get_board(settings, title):
+    if title not in settings.boards:
+        raise CliError("no board named %r" % title)
+    return settings.boards[title]
+
+
+def get_tasklist(board, title):
+    for l in board.tasklists:
+        if l.title == title:
+            return l
+    raise CliError("no list named %r on board %r" % (title, board.title))
+
+
+def parse_date(text):
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError("not a YYYY-MM-DD date: %r" % text)
+
+
+def non_negative(text):
+    value = int(text)
+    if value < 0:
+        raise argparse.ArgumentTypeError("must not be negative: %r" % text)
+    return value
+
+
+def format_task(board, tasklist, task):
+    due = task.due_date
+    due = "" if due is None else "%04d-%02d-%02d" % (due.year, due.month, due.day)
+    return "\t".join((board, tasklist, str(task.id), due, task.title))
+
+
+def cmd_add(settings, args, out):
+    board = get_board(settings, args.board)
+    tasklist = get_tasklist(board, args.list)
+    task = tasklist.add_new(args.title)
+    if args.due is not None:
+        task.set_due_date(args.due.year, args.due.month, args.due.day)
+    settings.save_board(board.title)
+    print(task.id, file=out)
+
+
+def cmd_list(settings, args, out):
+    if args.overdue or args.due_within is not None:
+        if args.overdue:
+            until = date.today() - timedelta(days=1)
+        else:
+            until = date.today() + timedelta(days=args.due_within)
+        # Backends with a due date index answer without loading boards
+        for board, listname, task in settings.storage.find_due(until):
+            if args.board in (None, board) and args.list in (None, listname):
+                print(format_task(board, listname, task), file=out)
+        return
+    titles = list(settings.boards) if args.board is None else [args.board]
+    if len(titles) == 0:
+        raise CliError("no boards in %s" % settings.config_dir)
+    for title in titles:
+        board = get_board(settings, title)
+        for l in board.tasklists:
+            if args.list in (None, l.title):
+                for t in l.tasks:
+                    print(format_task(title, l.title, t), file=out)
+
+
+def cmd_move(settings, args, out):
+    board = get_board(settings, args.board)
+    task, source = board.find_task(args.task_id)
+    if task is None:
+        raise CliError("no task %d on board %r" % (args.task_id, board.title))
+    target = get_tasklist(board, args.list)
+    index = source.index_of(task)
+    if source is target:
+        position = min(args.position, len(target.tasks) - 1)
+        source.move(index, position)
+    else:
+        source.transfer(index, target, min(args.position, len(target.tasks)))
+    settings.save_board(board.title)
+
+
+def cmd_export(settings, args, out):
+    board = get_board(settings, args.board)
+    if args.output is None:
+        json.dump(board, out, cls=BoardEncoder)
+        out.write("\n")
+    else:
+        with open(args.output, "w") as f:
+            json.dump(board, f, cls=BoardEncoder)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="kanban --cli")
+    parser.add_argument("--config-dir", default=CONFIG_DIR,
+                        help="configuration directory (default: %(default)s)")
+    parser.add_argument("--storage", choices=("json", "sqlite"),
+                        help="storage backend (default: the one the boards are stored with)")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+
+    add = commands.add_parser("add", help="add a task at the end of a list")
+    add.add_argument("board")
+    add.add_argument("list")
+    add.add_argument("title")
+    add.add_argument("--due", type=parse_date, help="due date, YYYY-MM-DD")
+    add.set_defaults(run=cmd_add)
+
+    ls = commands.add_parser("list", help="print tasks, one per line")
+    ls.add_argument("board", nargs="?")
+    ls.add_argument("--list", help="only tasks of this list")
+    due = ls.add_mutually_exclusive_group()
+    due.add_argument("--overdue", action="store_true",
+                     help="only tasks due before today")
+    due.add_argument("--due-within", type=int, metavar="DAYS",
+                     help="only tasks due in the next DAYS days, or overdue")
+    ls.set_defaults(run=cmd_list)
+
+    move = commands.add_parser("move", help="move a task to a list")
+    move.add_argument("board")
+    move.add_argument("task_id", type=int)
+    move.add_argument("list")
+    move.add_argument("--position", type=non_negative, default=0,
+                      help="index in the target list (default: top)")
+    move.set_defaults(run=cmd_move)
+
+    export = commands.add_parser("export", help="write a board as json")
+    export.add_argument("board")
+    export.add_argument("-o", "--output", help="file to write (default: stdout)")
+    export.set_defaults(run=cmd_export)
+    return parser
+
+
+def main(argv):
+    args = build_parser().parse_args(argv)
+    if not args.config_dir.endswith("/"):
+        args.config_dir += "/"
+    out = sys.stdout
+    try:
+        # The storage backends log to stdout, which is kept for the output
+        with redirect_stdout(sys.stderr):
+            settings = open_settings(args.config_dir, args.storage)
+            args.run(settings, args, out)
+    except (CliError, OSError) as e:
+        print("kanban:", e, file=sys.stderr)
+        return 1
+    return 0
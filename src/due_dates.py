@@ -0,0 +1,196 @@
+# due_dates.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+from bisect import bisect_left, insort
+from datetime import date, datetime
+
+
+# Style classes by the number of days until the due date, the same for
+# overdue tasks. Tasks due later have no class.
+PRIORITIES = {1: "priority-high", 2: "priority-medium", 3: "priority-low"}
+PRIORITY_DAYS = max(PRIORITIES)
+
+
+def priority(due, today):
+    # due and today are date ordinals, due is 0 when the task has none
+    if due == 0:
+        return None
+    return PRIORITIES.get(max(due - today, 1))
+
+
+# Due dates of the tasks of a board sorted as (ordinal, task id), which
+# tells which tasks change priority on a given day without visiting the
+# others. Follows the board through its signals.
+class DueIndex:
+
+    def __init__(self, board):
+        self.board = board
+        # task id -> due ordinal
+        self.dues = dict()
+        for l in board.tasklists:
+            for t in l.tasks:
+                if t.get_due_ordinal() != 0:
+                    self.dues[t.id] = t.get_due_ordinal()
+        self.entries = sorted((due, task_id) for task_id, due in self.dues.items())
+        # Called with the due ordinal of every added or changed entry
+        self.on_changed = None
+        self.handlers = [board.connect("inserted", self.on_task_changed),
+                         board.connect("updated", self.on_task_changed),
+                         board.connect("removed", self.on_task_removed),
+                         board.connect("list-added", self.on_list_added)]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def detach(self):
+        for handler in self.handlers:
+            self.board.disconnect(handler)
+        self.handlers = []
+
+    def set_due(self, task_id, due):
+        old = self.dues.get(task_id, 0)
+        if old == due:
+            return
+        if old != 0:
+            del self.entries[bisect_left(self.entries, (old, task_id))]
+            del self.dues[task_id]
+        if due != 0:
+            insort(self.entries, (due, task_id))
+            self.dues[task_id] = due
+            if self.on_changed is not None:
+                self.on_changed(due)
+
+    def on_task_changed(self, board, tasklist, task, *args):
+        self.set_due(task.id, task.get_due_ordinal())
+
+    def on_task_removed(self, board, tasklist, task, index):
+        self.set_due(task.id, 0)
+
+    def on_list_added(self, board, tasklist):
+        for t in tasklist.tasks:
+            self.set_due(t.id, t.get_due_ordinal())
+
+    def between(self, first, last):
+        # Ids of the tasks due from first to last (ordinals, inclusive)
+        i = bisect_left(self.entries, (first,))
+        entries = self.entries
+        while i < len(entries) and entries[i][0] <= last:
+            yield entries[i][1]
+            i += 1
+
+    def first_after(self, day):
+        # Earliest due ordinal after day, or None
+        i = bisect_left(self.entries, (day + 1,))
+        if i < len(self.entries):
+            return self.entries[i][0]
+        return None
+
+    def next_change(self, today):
+        # First day after today on which a task of the board changes
+        # priority, or None. Priorities change at midnight only: a task
+        # due on day D moves up on D - 3, D - 2 and D - 1.
+        due = self.first_after(today + 1)
+        if due is None:
+            return None
+        return max(due - PRIORITY_DAYS, today + 1)
+
+
+# Keeps a single timeout for all watched boards, set to the next midnight
+# at which the priority of a task changes. Only the rows of those tasks are
+# restyled. Timer functions are passed in (GLib.timeout_add_seconds and
+# GLib.source_remove in the app) like for the AutosaveScheduler.
+class DueScheduler:
+
+    def __init__(self, timeout_add_seconds, source_remove, now=datetime.now):
+        self.timeout_add_seconds = timeout_add_seconds
+        self.source_remove = source_remove
+        self.now = now
+        # DueIndex -> callback called with (task ids, today ordinal)
+        self.watched = dict()
+        self.source = None
+        # Ordinal of the day the timeout is set for
+        self.wake_day = None
+        # Day for which the watched rows were last styled
+        self.styled_day = self.today()
+
+    def today(self):
+        return self.now().date().toordinal()
+
+    def watch(self, index, restyle):
+        self.watched[index] = restyle
+        index.on_changed = self.on_changed
+        self.schedule()
+
+    def discard(self, index):
+        if self.watched.pop(index, None) is not None:
+            index.on_changed = None
+            self.schedule()
+
+    def on_changed(self, due):
+        # A new due date can only bring the next change closer
+        if self.wake_day is None or due - PRIORITY_DAYS < self.wake_day:
+            self.schedule()
+
+    def schedule(self):
+        today = self.today()
+        days = [d for d in (i.next_change(today) for i in self.watched) if d is not None]
+        wake_day = min(days) if len(days) > 0 else None
+        if wake_day == self.wake_day and self.source is not None:
+            return
+        self.cancel()
+        self.wake_day = wake_day
+        if wake_day is None:
+            return
+        midnight = datetime.combine(date.fromordinal(wake_day), datetime.min.time())
+        # A second late, so the clock is past midnight when it fires
+        seconds = int((midnight - self.now()).total_seconds()) + 1
+        self.source = self.timeout_add_seconds(max(seconds, 1), self.on_timeout)
+
+    def cancel(self):
+        if self.source is not None:
+            self.source_remove(self.source)
+            self.source = None
+        self.wake_day = None
+
+    def on_timeout(self):
+        self.source = None
+        self.wake_day = None
+        self.update()
+        return False
+
+    def update(self):
+        # The last styling can be several days ago after a suspend, a task
+        # due on D changed priority if one of D - 3 .. D - 1 has passed since
+        today = self.today()
+        if today > self.styled_day:
+            for index, restyle in self.watched.items():
+                task_ids = list(index.between(self.styled_day + 2, today + PRIORITY_DAYS))
+                if len(task_ids) > 0:
+                    restyle(task_ids, today)
+            self.styled_day = today
+        self.schedule()
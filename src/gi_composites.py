@@ -77,12 +77,13 @@ def _register_template(cls, template_bytes):
     bound_methods = set()
     bound_widgets = set()
 
-    # Walk the class, find marked callbacks and child attributes
-    for name in dir(cls):
+    # Walk the class, find marked callbacks and child attributes. Only the
+    # class itself is walked: inheriting from a template class is not
+    # allowed, and dir() would resolve every attribute of the Gtk bases
+    # at import time.
+    for name, o in list(vars(cls).items()):
 
-        o = getattr(cls, name, None)
-
-        if inspect.ismethod(o):
+        if inspect.isfunction(o) or inspect.ismethod(o):
             if hasattr(o, '_gtk_callback'):
                 bound_methods.add(name)
                 # Don't need to call this, as connect_func always gets called
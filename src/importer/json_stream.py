@@ -0,0 +1,187 @@
+# json_stream.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import json
+import os
+import re
+
+
+CHUNK_SIZE = 64 * 1024
+
+WHITESPACE = re.compile(r"\s*")
+# Whitespace and commas between the elements of an array
+SEPARATOR = re.compile(r"[\s,]*")
+NUMBER = re.compile(r"[-+0-9.eE]*")
+
+
+# Incremental reader of a JSON document holding only a chunk of the file in
+# memory, and the values of a top-level array one at a time.
+class JsonStream:
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE, on_read=None):
+        self.f = f
+        self.chunk_size = chunk_size
+        # Called with the number of characters read so far
+        self.on_read = on_read
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.read = 0
+        self.eof = False
+
+    def fill(self):
+        # Drops what was consumed and appends the next chunk
+        chunk = self.f.read(self.chunk_size)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        self.read += len(chunk)
+        if self.on_read is not None:
+            self.on_read(self.read)
+        if len(chunk) == 0:
+            self.eof = True
+        return not self.eof
+
+    def peek(self):
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError("Expected %r at offset %d of the buffer" % (char, self.pos))
+        self.pos += 1
+
+    def decode_value(self):
+        self.peek()
+        # A number at the end of the buffer may continue in the next chunk
+        while NUMBER.match(self.buffer, self.pos).end() == len(self.buffer) and self.fill():
+            pass
+        while True:
+            try:
+                value, self.pos = self.decoder.raw_decode(self.buffer, self.pos)
+                return value
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+
+    def skip_value(self):
+        # Elements of an array are decoded and dropped one at a time, which
+        # is faster than scanning them in Python
+        if self.peek() == "[":
+            for value in self.iter_array():
+                pass
+        else:
+            self.decode_value()
+
+    def iter_array(self):
+        # Same as decode_value for every element of iter_elements, with
+        # fewer steps per element for arrays of many small values
+        self.expect("[")
+        # raw_decode without its wrapper, which raises StopIteration when
+        # there is no value
+        scan = self.decoder.scan_once
+        while True:
+            buffer = self.buffer
+            pos = SEPARATOR.match(buffer, self.pos).end()
+            self.pos = pos
+            if pos < len(buffer) and buffer[pos] == "]":
+                self.pos += 1
+                return
+            # A number at the end of the buffer may continue in the next
+            # chunk, other values which are cut raise an error
+            if NUMBER.match(buffer, pos).end() == len(buffer) and not self.eof:
+                self.fill()
+                continue
+            try:
+                value, end = scan(buffer, pos)
+            except (StopIteration, json.JSONDecodeError):
+                if self.eof:
+                    raise json.JSONDecodeError("Expecting value", buffer, pos)
+                self.fill()
+                continue
+            self.pos = end
+            yield value
+
+    def iter_elements(self):
+        # Index of every element of an array, which the caller reads before
+        # the next one
+        self.expect("[")
+        i = 0
+        while True:
+            char = self.peek()
+            if char == "]":
+                self.pos += 1
+                return
+            if char == ",":
+                self.pos += 1
+                continue
+            if char == "":
+                raise ValueError("Unexpected end of the document")
+            yield i
+            i += 1
+
+    def iter_members(self):
+        # Name of every member of an object, the caller reads its value
+        # (decode_value, skip_value, iter_elements...) before the next one
+        self.expect("{")
+        while True:
+            char = self.peek()
+            if char == "}":
+                self.pos += 1
+                return
+            if char == ",":
+                self.pos += 1
+                continue
+            if char == "":
+                raise ValueError("Unexpected end of the document")
+            name = self.decode_value()
+            self.expect(":")
+            yield name
+
+    def iter_items(self, *keys):
+        # (key, element) for the arrays stored under keys in the top-level
+        # object, in file order
+        for name in self.iter_members():
+            if name in keys:
+                for value in self.iter_array():
+                    yield name, value
+            else:
+                self.skip_value()
+
+
+def iter_items(filename, *keys, progress=None):
+    # progress is called with the approximate fraction of the file read
+    on_read = None
+    if progress is not None:
+        size = max(1, os.path.getsize(filename))
+        on_read = lambda read: progress(min(1.0, read / size))
+    with open(filename, "r", encoding="utf-8") as f:
+        yield from JsonStream(f, on_read=on_read).iter_items(*keys)
@@ -26,25 +26,206 @@
 # use or other dealings in this Software without prior written
 # authorization.
 
-import json
+import gc
+import time
+import threading
+from collections import deque
 
-def import_data(settings, filename):
+from .Board import Board
+from .Task import Task
+from .json_stream import iter_items
+
+
+# Items handed to the main loop at once by TrelloImport
+BATCH_SIZE = 500
+# Seconds the main loop spends adding items per idle call, the rest of a
+# batch waits for the next one so a frame is not missed
+APPLY_TIME = 0.008
+# Batches waiting for the main loop before the reader pauses
+MAX_PENDING_BATCHES = 8
+
+
+# Trello exports are mostly actions, checklists and members; only lists and
+# cards are decoded, one at a time
+def import_data(settings, filename, title="Work"):
     print("import", filename)
-    with open(filename, "r") as f:
-        data = json.load(f)
-        board = next(iter(settings.boards.values()))
-        lists = dict()
-        for l in data["lists"]:
-            lists[l["id"]] = l["name"]
-            if l["name"] not in board.tasklists:
-                tasklist = board.add_new(l["name"])
-        for card in data["cards"]:
-            if card["closed"]:
-                continue
-            listname = lists[card["idList"]]
-            tasklist = board.tasklists[listname]
-            task = tasklist.add_new(card["name"])
-            task.description = card["desc"]
-            task.due = card["due"]
-            task.labels = card["labels"]
+    board = get_board(settings, title)
+    tasklists = {l.title: l for l in board.tasklists}
+    for listname, task in read_export(filename):
+        add_item(board, tasklists, listname, task)
+
+
+def get_board(settings, title):
+    if title not in settings.boards:
+        settings.add_board(Board(title))
+    return settings.boards[title]
+
+
+def add_item(board, tasklists, listname, task):
+    tasklist = tasklists.get(listname)
+    if tasklist is None:
+        tasklist = board.add_new(listname)
+        tasklists[listname] = tasklist
+    if task is not None:
+        tasklist.add(task)
+
+
+def read_export(filename, progress=None):
+    # Yields (list name, None) for every list and (list name, task) for
+    # every open card. Cards which come before their list in the file are
+    # held back until the list was read.
+    lists = dict()
+    pending = []
+    for key, item in iter_items(filename, "lists", "cards", progress=progress):
+        if key == "lists":
+            lists[item["id"]] = item["name"]
+            yield item["name"], None
+        elif not item["closed"]:
+            if item["idList"] in lists:
+                yield lists[item["idList"]], card_to_task(item)
+            else:
+                pending.append((item["idList"], card_to_task(item)))
+    for list_id, task in pending:
+        if list_id in lists:
+            yield lists[list_id], task
+
+
+def card_to_task(card):
+    task = Task(card["name"])
+    task.set_field("description", card["desc"])
+    task.set_field("due", card["due"])
+    task.set_field("labels", card["labels"])
+    return task
+
+
+# Import which reads and decodes the export in a worker thread and adds the
+# lists and cards on the main loop in batches through idle_add
+# (GLib.idle_add in the app), so the window keeps drawing. The board is not
+# saved until the import finished; a cancelled or failed import drops the
+# board from memory, so it is read again as it was before from storage.
+class TrelloImport:
+
+    def __init__(self, settings, autosave, filename, idle_add, title="Work",
+                 batch_size=BATCH_SIZE):
+        self.settings = settings
+        self.autosave = autosave
+        self.filename = filename
+        self.idle_add = idle_add
+        self.title = title
+        self.batch_size = batch_size
+        self.fraction = 0.0
+        # Batches received on the main loop and not added yet
+        self.queue = deque()
+        self.draining = False
+        self.cancelled = False
+        self.finished = False
+        self.slots = threading.Semaphore(MAX_PENDING_BATCHES)
+        # Set by the caller: on_progress(fraction), on_done(error)
+        self.on_progress = lambda fraction: None
+        self.on_done = lambda error: None
+
+    def start(self):
+        print("import", self.filename)
+        # Everything on disk is current, so it can be gone back to
+        self.autosave.flush()
+        self.autosave.hold(self.title)
+        # Cyclic GC passes over the growing board find nothing to collect
+        # but stall the main loop for tens of ms (see decodeBoard)
+        self.gc_enabled = gc.isenabled()
+        gc.disable()
+        self.board = get_board(self.settings, self.title)
+        self.tasklists = {l.title: l for l in self.board.tasklists}
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        if self.finished:
+            return
+        self.cancelled = True
+        self.end("Import cancelled")
+
+    # Worker thread
+    def set_fraction(self, fraction):
+        self.fraction = fraction
+
+    def run(self):
+        try:
+            batch = []
+            for item in read_export(self.filename, self.set_fraction):
+                if self.cancelled:
+                    return
+                batch.append(item)
+                if len(batch) == self.batch_size:
+                    self.post(batch, False)
+                    batch = []
+            self.post(batch, True)
+        except Exception as e:
+            self.idle_add(self.fail, e)
+
+    def post(self, batch, last):
+        # Waits while the main loop is behind, so decoded cards do not pile up
+        while not self.slots.acquire(timeout=0.1):
+            if self.cancelled:
+                return
+        self.idle_add(self.apply, batch, self.fraction, last)
+
+    # Main loop
+    def apply(self, batch, fraction, last):
+        if self.finished:
+            self.slots.release()
+            return False
+        # Batches are added in order by a single idle call
+        self.queue.append((batch, fraction, last))
+        if not self.draining:
+            self.draining = True
+            self.idle_add(self.drain)
+        return False
+
+    def drain(self):
+        # Adds queued items for at most APPLY_TIME, then lets the main loop
+        # draw and is called again
+        deadline = time.perf_counter() + APPLY_TIME
+        while len(self.queue) > 0 and not self.finished:
+            batch, fraction, last = self.queue[0]
+            done = 0
+            while done < len(batch):
+                listname, task = batch[done]
+                add_item(self.board, self.tasklists, listname, task)
+                done += 1
+                if time.perf_counter() >= deadline:
+                    break
+            if done < len(batch):
+                del batch[:done]
+                return True
+            self.queue.popleft()
+            self.slots.release()
+            self.on_progress(1.0 if last else fraction)
+            if last:
+                self.finish()
+                self.autosave.release(self.title)
+                self.on_done(None)
+            elif time.perf_counter() >= deadline:
+                return True
+        for i in range(len(self.queue)):
+            self.slots.release()
+        self.queue.clear()
+        self.draining = False
+        return False
+
+    def fail(self, error):
+        if not self.finished:
+            self.end("Import failed: %s" % error)
+        return False
+
+    def finish(self):
+        self.finished = True
+        if self.gc_enabled:
+            gc.enable()
 
+    def end(self, error):
+        print(error)
+        self.finish()
+        self.autosave.dirty.discard(self.title)
+        self.autosave.release(self.title)
+        self.settings.boards.unload(self.title)
+        self.on_done(error)
@@ -34,15 +34,15 @@ import gi
 gi.require_version('Gtk', '3.0')
 
 from gi.repository import Gtk, Gio, GLib, Gdk
-from .trello_importer import import_data
 from .Board import Board
-from .settings import KanbanSettings
+from .settings import CONFIG_DIR
 from .window import KanbanWindow
+from . import profiling
 
 
 class Application(Gtk.Application):
 
-    config_dir = os.environ["HOME"] + "/.config/kanban/"
+    config_dir = CONFIG_DIR
 
     def __init__(self, version):
         super().__init__(application_id='org.gnome.kanban',
@@ -50,34 +50,54 @@ class Application(Gtk.Application):
         self.version = version
         self.add_main_option("debug", ord("d"), GLib.OptionFlags.NONE,
                              GLib.OptionArg.NONE, "Debug Mode", None)
+        self.add_main_option("profile", ord("p"), GLib.OptionFlags.NONE,
+                             GLib.OptionArg.NONE, "Print timings of the hot paths on exit", None)
+        # Handled by the launcher, declared so it is accepted
+        self.add_main_option("profile-startup", 0, GLib.OptionFlags.NONE,
+                             GLib.OptionArg.NONE, "Print the time spent in each startup phase", None)
 
     def do_startup(self):
         Gtk.Application.do_startup(self)
         self.create_action("trello-import", self.on_trello_import)
         self.create_action("about", self.on_about)
+        self.create_action("quick-switch", self.on_quick_switch)
+        self.set_accels_for_action("app.quick-switch", ["<Primary>k"])
         self.create_action("quit", self.on_quit)
         builder = Gtk.Builder.new_from_resource(
             "/org/gnome/kanban/ui/menus.ui")
         self.set_app_menu(builder.get_object("app-menu"))
+        profiling.mark("app startup")
 
     def create_action(self, name, callback, signal="activate"):
         action = Gio.SimpleAction.new(name, None)
         action.connect(signal, callback)
         self.add_action(action)
 
+    def do_shutdown(self):
+        profiling.report()
+        Gtk.Application.do_shutdown(self)
+
     def do_activate(self):
         win = self.props.active_window
         if not win:
             win = KanbanWindow(application=self, config_dir=self.config_dir)
         win.connect("destroy", self.on_quit)
+        if profiling.startup is not None:
+            self.first_draw = win.connect_after("draw", self.on_first_draw)
         win.present()
 
+    def on_first_draw(self, win, cr):
+        win.disconnect(self.first_draw)
+        profiling.end_startup("first draw")
+
     def do_command_line(self, command_line):
         options = command_line.get_options_dict()
         if options.contains("debug"):
             self.config_dir = os.path.dirname(
                 os.path.abspath(__file__)) + "/.debug_data/"
             print("Debug mode selected - config dir:", self.config_dir)
+        if options.contains("profile"):
+            profiling.enable()
         self.activate()
         return 0
 
@@ -96,14 +116,43 @@ class Application(Gtk.Application):
             confirmdialog = Gtk.MessageDialog(win, 0, Gtk.MessageType.WARNING,
                                               Gtk.ButtonsType.YES_NO, "Do you want to clear current tasks? THIS CANNOT BE REVERTED.")
             response = confirmdialog.run()
-            if response == Gtk.ResponseType.YES:
-                b = Board("Work")
-                self.user_settings.boards["Work"] = b
-            import_data(self.user_settings, dialog.get_filename())
-            win.draw_board("Work")
             confirmdialog.destroy()
+            filename = dialog.get_filename()
+            dialog.destroy()
+            self.start_import(win, filename, response == Gtk.ResponseType.YES)
+            return
         dialog.destroy()
 
+    def start_import(self, win, filename, clear):
+        # The importer is not needed for the first screen
+        from .trello_importer import TrelloImport
+        from .ImportDialog import ImportDialog
+        job = TrelloImport(win.user_settings, win.autosave, filename, GLib.idle_add)
+        if clear:
+            # Saving of the new board waits for the import, so cancelling
+            # brings back the old one
+            win.autosave.flush()
+            win.user_settings.boards["Work"] = Board("Work")
+        progress = ImportDialog(win, os.path.basename(filename))
+        progress.connect("response", lambda d, response: job.cancel())
+        job.on_progress = progress.set_fraction
+
+        def on_done(error):
+            progress.destroy()
+            if "Work" in win.user_settings.boards:
+                win.draw_board("Work")
+            else:
+                win.draw_boards_list()
+        job.on_done = on_done
+        job.start()
+        # Cards show up on the board while they are imported
+        win.draw_board("Work")
+
+    def on_quick_switch(self, action, param):
+        win = self.props.active_window
+        if win is not None:
+            win.show_quick_switcher()
+
     def on_about(self, action, param):
         about_dialog = Gtk.AboutDialog(
             transient_for=self.props.active_window, modal=True)
@@ -120,7 +169,8 @@ class Application(Gtk.Application):
     def on_quit(self, param):
         if self.props.active_window is not None:
             self.props.active_window.save_board_info()
-            self.props.active_window.user_settings.save()
+            self.props.active_window.autosave.flush()
+            self.props.active_window.geometry.flush()
 
 
 def main(version):
@@ -131,5 +181,6 @@ def main(version):
         style_provider,
         Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
     )
+    profiling.mark("css")
     app = Application(version)
     return app.run(sys.argv)
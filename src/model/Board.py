@@ -27,12 +27,23 @@
 # authorization.
 
 from .TaskList import TaskList
+from .events import Observable
 
-class Board:
+
+# Signals: "list-added" (tasklist), "changed" (change record) after every
+# modification, and the task signals of its lists with the list as first
+# argument.
+class Board(Observable):
 
     def __init__(self, title):
         self.title = title
         self.tasklists = []
+        self._handlers = None
+        self._revision = 0
+        self._saved_revision = 0
+        self._changes = []
+        # task id -> task, the task knows its list
+        self._index = dict()
 
     def __str__(self):
         board_str = "=== " + self.title + " ==="
@@ -46,4 +57,45 @@ class Board:
         return tasklist
 
     def add(self, tasklist):
+        tasklist._board = self
         self.tasklists.append(tasklist)
+        for t in tasklist.tasks:
+            self.index_task(t)
+        self.touch({"op": "add_list", "tasklist": tasklist.to_dict()})
+        self.emit("list-added", tasklist)
+
+    def find_task(self, task_id):
+        task = self._index.get(task_id)
+        if task is None:
+            return None, None
+        return task, task.get_tasklist()
+
+    def index_task(self, task):
+        self._index[task.id] = task
+
+    def unindex_task(self, task):
+        self._index.pop(task.id, None)
+
+    def rebuild_index(self):
+        self._index = {t.id: t for l in self.tasklists for t in l.tasks}
+
+    # Every modification bumps the revision and records a small change
+    # description which journaled storage appends instead of the whole board
+    def touch(self, change=None):
+        self._revision += 1
+        if change is not None:
+            self._changes.append(change)
+        self.emit("changed", change)
+
+    def get_revision(self):
+        return self._revision
+
+    def pending_changes(self):
+        return self._changes
+
+    def is_modified(self):
+        return self._revision != self._saved_revision
+
+    def mark_saved(self):
+        self._saved_revision = self._revision
+        self._changes = []
@@ -26,31 +26,166 @@
 # use or other dealings in this Software without prior written
 # authorization.
 
-from datetime import datetime
+import sys
+import random
+from datetime import date, datetime
+
+from .events import Observable
+
+
+# Strings up to this length in optional fields (label names, colors...) are
+# interned, longer ones (descriptions) are mostly unique
+INTERN_MAX_LENGTH = 64
+
+
+def intern_strings(value):
+    if isinstance(value, str):
+        if len(value) <= INTERN_MAX_LENGTH:
+            return sys.intern(value)
+        return value
+    if isinstance(value, list):
+        return [intern_strings(v) for v in value]
+    if isinstance(value, dict):
+        return {sys.intern(k): intern_strings(v) for k, v in value.items()}
+    return value
+
+
+def restore_slots(obj, state):
+    if isinstance(state, tuple):
+        # (None, slots) as written by the default __reduce_ex__
+        state = state[1]
+    for k, v in state.items():
+        setattr(obj, k, v)
+
 
 #TODO use UTC time
 class DueDate:
+    __slots__ = ("year", "month", "day")
 
     def __init__(self, year, month, day):
         self.year = year
         self.month = month
         self.day = day
 
-class Task:
+    def __setstate__(self, state):
+        # Configurations pickled before __slots__ store the attribute dict
+        restore_slots(self, state)
+
+    def to_ordinal(self):
+        return date(self.year, self.month, self.day).toordinal()
+
+    def to_dict(self):
+        return {"year": self.year, "month": self.month, "day": self.day}
+
+
+def new_task_id():
+    # Random 63 bit integer: fits a SQLite INTEGER and is cheaper to keep in
+    # memory than a uuid string
+    return random.getrandbits(63)
 
-    def __init__(self, title):
+
+# Boards can hold 100k+ tasks, so a task has no __dict__: the due date is
+# packed as a date ordinal (0 when unset) and optional fields such as the
+# ones added by the trello importer live in a dict created only when used.
+# Signals: "updated" after the title, due date or a field changed.
+class Task(Observable):
+    __slots__ = ("id", "order", "title", "creation_date", "update_date",
+                 "_due", "_extra", "_tasklist", "_handlers")
+
+    def __init__(self, title, creation_date=None, update_date=None, due_ordinal=0,
+                 task_id=None, order=None):
+        if task_id is None:
+            task_id = new_task_id()
+        if creation_date is None:
+            creation_date = datetime.now().timestamp()
+        if update_date is None or update_date == creation_date:
+            # Share the float object of tasks which were never edited
+            update_date = creation_date
+        self.id = task_id
+        # Sort key within the list, see order_keys.py
+        self.order = order
         self.title = title
-        self.creation_date = datetime.now().timestamp()
-        self.update_date = self.creation_date
-        self.due_date = None
+        self.creation_date = creation_date
+        self.update_date = update_date
+        self._due = due_ordinal
+        self._extra = None
+        self._tasklist = None
+        self._handlers = None
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            self.order = None
+            self._handlers = None
+            restore_slots(self, state)
+            return
+        # Configurations pickled before __slots__ store the attribute dict
+        state = dict(state)
+        due_date = state.pop("due_date", None)
+        self.__init__(state.pop("title"), state.pop("creation_date", None),
+                      state.pop("update_date", None))
+        if due_date is not None:
+            self._due = due_date.to_ordinal()
+        for k, v in state.items():
+            self.set_field(k, v)
 
     def __str__(self):
         return "#%s" % self.title
 
+    @property
+    def due_date(self):
+        if self._due == 0:
+            return None
+        d = date.fromordinal(self._due)
+        return DueDate(d.year, d.month, d.day)
+
+    def get_due_ordinal(self):
+        return self._due
+
     def set_title(self, title):
         self.title = title
         self.update_date = datetime.now().timestamp()
+        self.touch()
 
     def set_due_date(self, year, month, day):
-        self.due_date = DueDate(year, month, day)
+        self._due = date(year, month, day).toordinal()
+        self.touch()
+
+    def clear_due_date(self):
+        self._due = 0
+        self.touch()
+
+    def get_field(self, name, default=None):
+        if self._extra is None:
+            return default
+        return self._extra.get(name, default)
+
+    def set_field(self, name, value):
+        if self._extra is None:
+            self._extra = dict()
+        self._extra[sys.intern(name)] = intern_strings(value)
+
+    def copy_from(self, task):
+        # Takes over the contents of task but keeps own id and list
+        self.title = task.title
+        self.creation_date = task.creation_date
+        self.update_date = task.update_date
+        self._due = task._due
+        self._extra = task._extra
+
+    def get_tasklist(self):
+        return self._tasklist
+
+    def to_dict(self):
+        d = {"id": self.id, "order": self.order, "title": self.title,
+             "creation_date": self.creation_date,
+             "update_date": self.update_date, "due_date": self.due_date}
+        if self._extra is not None:
+            d.update(self._extra)
+        return d
 
+    def touch(self):
+        if self._tasklist is not None:
+            self._tasklist.touch(
+                {"op": "update", "id": self.id, "task": self.to_dict()})
+            self._tasklist.notify("updated", self)
+        self.emit("updated")
@@ -26,13 +26,46 @@
 # use or other dealings in this Software without prior written
 # authorization.
 
+from bisect import bisect_left
+
 from .Task import Task
+from .events import Observable
+from .order_keys import key_between, fits, spread_keys
+
+
+# Keys longer than this (after many inserts at the same spot) trigger a
+# rebalance of the whole list
+MAX_KEY_LENGTH = 20
+
+
+class KeyView:
+    # Sequence of the order keys of tasks, without copying them
+    __slots__ = ("tasks",)
 
-class TaskList:
+    def __init__(self, tasks):
+        self.tasks = tasks
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __getitem__(self, index):
+        return self.tasks[index].order
+
+
+# Tasks are kept sorted by their order key. Inserting or moving a task
+# only gives it a new key between its neighbours, so persisting a move
+# writes a single record.
+# Signals: "inserted" (task, index), "removed" (task, index), "moved" (task,
+# index, new_index) and "updated" (task). A transfer to another list is
+# "removed" on this list and "inserted" on the other. The board emits them as well,
+# with the list as first argument.
+class TaskList(Observable):
 
     def __init__(self, title):
         self.title = title
         self.tasks = []
+        self._board = None
+        self._handlers = None
 
     def __str__(self):
         list_str = ">" + self.title
@@ -42,14 +75,96 @@ class TaskList:
 
     def add_new(self, title):
         task = Task(title)
-        self.tasks.append(task)
+        self.add(task)
         return task
 
     def add(self, task):
-        self.tasks.append(task)
+        self.insert(len(self.tasks), task)
 
     def insert(self, index, task):
+        task._tasklist = self
         self.tasks.insert(index, task)
+        self.place(index)
+        if self._board is not None:
+            self._board.index_task(task)
+        self.touch({"op": "insert", "index": index, "task": task.to_dict()})
+        self.check_keys(task)
+        self.notify("inserted", task, index)
 
     def remove(self, index):
-        del self.tasks[index]
+        task = self.tasks.pop(index)
+        if self._board is not None:
+            self._board.unindex_task(task)
+        self.touch({"op": "remove", "index": index, "id": task.id})
+        self.notify("removed", task, index)
+
+    def move(self, index, new_index):
+        task = self.tasks.pop(index)
+        self.tasks.insert(new_index, task)
+        self.place(new_index)
+        self.touch({"op": "move", "id": task.id, "from": index,
+                    "index": new_index, "order": task.order})
+        self.check_keys(task)
+        self.notify("moved", task, index, new_index)
+
+    def transfer(self, index, target, new_index):
+        # Moves a task to another list of the same board as one change:
+        # a single record is persisted, with the new list and order key
+        if self._board is None or target._board is not self._board:
+            task = self.tasks[index]
+            self.remove(index)
+            target.insert(new_index, task)
+            return
+        task = self.tasks.pop(index)
+        task._tasklist = target
+        target.tasks.insert(new_index, task)
+        target.place(new_index)
+        target.touch({"op": "transfer", "id": task.id, "from": index,
+                      "index": new_index, "order": task.order})
+        target.check_keys(task)
+        self.notify("removed", task, index)
+        target.notify("inserted", task, new_index)
+
+    def index_of(self, task):
+        # Binary search on the order keys instead of a scan of the list
+        keys = KeyView(self.tasks)
+        index = bisect_left(keys, task.order)
+        if index < len(self.tasks) and self.tasks[index] is task:
+            return index
+        return self.tasks.index(task)
+
+    def place(self, index):
+        # Keep the key of the task at index if it still sorts between its
+        # neighbours (e.g. journal replay), otherwise generate a new one
+        task = self.tasks[index]
+        before = self.tasks[index - 1].order if index > 0 else None
+        after = self.tasks[index + 1].order if index + 1 < len(self.tasks) else None
+        if task.order is None or not fits(task.order, before, after):
+            task.order = key_between(before, after)
+
+    def check_keys(self, task):
+        if len(task.order) > MAX_KEY_LENGTH:
+            self.rebalance()
+
+    def spread_keys(self):
+        for task, key in zip(self.tasks, spread_keys(len(self.tasks))):
+            task.order = key
+
+    def rebalance(self):
+        self.spread_keys()
+        self.touch({"op": "rebalance",
+                    "orders": [[t.id, t.order] for t in self.tasks]})
+
+    def to_dict(self):
+        return {"title": self.title, "tasks": [t.to_dict() for t in self.tasks]}
+
+    def notify(self, name, *args):
+        self.emit(name, *args)
+        if self._board is not None:
+            self._board.emit(name, self, *args)
+
+    def touch(self, change=None):
+        if self._board is not None:
+            if change is not None:
+                change["list"] = self._board.tasklists.index(self)
+            self._board.touch(change)
@@ -0,0 +1,59 @@
+# events.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+from itertools import count
+
+
+_handler_ids = count(1)
+
+
+# Signals of model objects, connected and disconnected like GObject signals
+# so views treat them like widget signals, without the model depending on
+# GObject. The handler list is only created for objects with handlers,
+# which are few next to the tasks of a large board.
+class Observable:
+    __slots__ = ()
+
+    def connect(self, name, callback, *args):
+        if self._handlers is None:
+            self._handlers = []
+        handler_id = next(_handler_ids)
+        self._handlers.append((handler_id, name, callback, args))
+        return handler_id
+
+    def disconnect(self, handler_id):
+        handlers = [h for h in self._handlers if h[0] != handler_id]
+        self._handlers = handlers if len(handlers) > 0 else None
+
+    def emit(self, name, *args):
+        if self._handlers is None:
+            return
+        # Handlers may disconnect while the signal is emitted
+        for handler_id, handler_name, callback, extra in list(self._handlers):
+            if handler_name == name:
+                callback(self, *args, *extra)
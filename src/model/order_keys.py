@@ -0,0 +1,174 @@
+# order_keys.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Fractional order keys: strings which sort like the tasks of a list. A key
+# can always be generated between two others, so a move only changes the
+# key of the moved task. A key is a variable length integer part, whose
+# first character encodes its length, followed by an optional fraction
+# which never ends with the smallest digit. Appending or prepending
+# increments the integer part, so keys grow logarithmically there; only
+# repeated inserts at the same spot make the fraction longer.
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+DIGIT_VALUES = {d: i for i, d in enumerate(DIGITS)}
+ZERO = DIGITS[0]
+SMALLEST_INTEGER = "A" + ZERO * 26
+
+
+def key_between(before, after):
+    # before < after, None stands for the start and end of the list
+    if before is not None and after is not None and before >= after:
+        raise ValueError("%r is not before %r" % (before, after))
+    if before is None:
+        if after is None:
+            return "a" + ZERO
+        integer = integer_part(after)
+        if integer == SMALLEST_INTEGER:
+            return integer + midpoint("", after[len(integer):])
+        if integer < after:
+            return integer
+        result = decrement_integer(integer)
+        if result is None:
+            raise ValueError("Cannot generate a key before %r" % after)
+        return result
+    integer = integer_part(before)
+    fraction = before[len(integer):]
+    if after is None:
+        result = increment_integer(integer)
+        if result is None:
+            return integer + midpoint(fraction, None)
+        return result
+    after_integer = integer_part(after)
+    if integer == after_integer:
+        return integer + midpoint(fraction, after[len(integer):])
+    result = increment_integer(integer)
+    if result is None:
+        raise ValueError("Cannot generate a key after %r" % before)
+    if result < after:
+        return result
+    return integer + midpoint(fraction, None)
+
+
+def fits(key, before, after):
+    return (before is None or before < key) and (after is None or key < after)
+
+
+def spread_keys(count):
+    # Consecutive short keys for count items, used to (re)initialize a list
+    keys = []
+    key = None
+    for i in range(count):
+        key = key_between(key, None)
+        keys.append(key)
+    return keys
+
+
+def midpoint(a, b):
+    # Fractions a < b, b None for the upper end
+    if b is not None:
+        # Keep the common prefix, padding a with zeros
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else ZERO) == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + midpoint(a[n:], b[n:])
+    digit_a = DIGIT_VALUES[a[0]] if len(a) > 0 else 0
+    digit_b = DIGIT_VALUES[b[0]] if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    # Consecutive digits
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[digit_a] + midpoint(a[1:], None)
+
+
+def integer_length(head):
+    if "a" <= head <= "z":
+        return ord(head) - ord("a") + 2
+    if "A" <= head <= "Z":
+        return ord("Z") - ord(head) + 2
+    raise ValueError("Invalid order key head %r" % head)
+
+
+def integer_part(key):
+    return key[:integer_length(key[0])]
+
+
+def increment_integer(integer):
+    head = integer[0]
+    digits = list(integer[1:])
+    carry = True
+    i = len(digits) - 1
+    while carry and i >= 0:
+        d = DIGIT_VALUES[digits[i]] + 1
+        if d == BASE:
+            digits[i] = ZERO
+        else:
+            digits[i] = DIGITS[d]
+            carry = False
+        i -= 1
+    if not carry:
+        return head + "".join(digits)
+    if head == "Z":
+        return "a" + ZERO
+    if head == "z":
+        return None
+    head = chr(ord(head) + 1)
+    if head > "a":
+        digits.append(ZERO)
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def decrement_integer(integer):
+    head = integer[0]
+    digits = list(integer[1:])
+    borrow = True
+    i = len(digits) - 1
+    while borrow and i >= 0:
+        d = DIGIT_VALUES[digits[i]] - 1
+        if d == -1:
+            digits[i] = DIGITS[-1]
+        else:
+            digits[i] = DIGITS[d]
+            borrow = False
+        i -= 1
+    if not borrow:
+        return head + "".join(digits)
+    if head == "a":
+        return "Z" + DIGITS[-1]
+    if head == "A":
+        return None
+    head = chr(ord(head) - 1)
+    if head < "Z":
+        digits.append(DIGITS[-1])
+    else:
+        digits.pop()
+    return head + "".join(digits)
@@ -0,0 +1,177 @@
+# profiling.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Startup profile enabled with --profile-startup. The launcher starts it
+# before importing gi, the app marks the end of every phase and the report
+# is printed to stderr after the window was drawn for the first time.
+#
+# Timing spans and counters enabled with --profile, reported on exit.
+# While disabled a span is a shared object with empty methods and a timed
+# function costs one flag check.
+#
+# Kept free of gi so the launcher and the cli can import it.
+
+import sys
+import time
+import functools
+
+
+class StartupProfile:
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.last = self.start
+        # (phase name, seconds)
+        self.phases = []
+
+    def mark(self, name):
+        # Ends the phase which started at the previous mark
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def report(self, out=sys.stderr):
+        total = self.last - self.start
+        print("%-16s %9s %6s" % ("startup phase", "ms", "%"), file=out)
+        for name, seconds in self.phases:
+            print("%-16s %9.1f %6.1f" % (name, seconds * 1000, 100 * seconds / total),
+                  file=out)
+        print("%-16s %9.1f" % ("total", total * 1000), file=out)
+
+
+startup = None
+
+
+def start_startup():
+    global startup
+    startup = StartupProfile()
+
+
+def mark(name):
+    if startup is not None:
+        startup.mark(name)
+
+
+def end_startup(name):
+    global startup
+    if startup is not None:
+        startup.mark(name)
+        startup.report()
+        startup = None
+
+
+enabled = False
+# span name -> list of durations in seconds
+spans = dict()
+# counter name -> value
+counters = dict()
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+class Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        durations = spans.get(self.name)
+        if durations is None:
+            spans[self.name] = [elapsed]
+        else:
+            durations.append(elapsed)
+        return False
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(name):
+    # with profiling.span("name"): ...
+    if enabled:
+        return Span(name)
+    return NULL_SPAN
+
+
+def timed(name):
+    # Decorator recording every call of a function as a span
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    if enabled:
+        counters[name] = counters.get(name, 0) + n
+
+
+def percentile(values, fraction):
+    # values must be sorted
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def report(out=sys.stderr):
+    if not enabled:
+        return
+    print("%-28s %7s %9s %9s %9s %9s %10s" % (
+        "span", "calls", "p50 ms", "p90 ms", "p99 ms", "max ms", "total ms"), file=out)
+    for name in sorted(spans):
+        values = sorted(spans[name])
+        print("%-28s %7d %9.2f %9.2f %9.2f %9.2f %10.1f" % (
+            name, len(values), percentile(values, 0.5) * 1000,
+            percentile(values, 0.9) * 1000, percentile(values, 0.99) * 1000,
+            values[-1] * 1000, sum(values) * 1000), file=out)
+    if len(counters) > 0:
+        print("%-28s %7s" % ("counter", "value"), file=out)
+        for name in sorted(counters):
+            print("%-28s %7d" % (name, counters[name]), file=out)
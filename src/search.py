@@ -0,0 +1,413 @@
+# search.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import re
+import heapq
+from bisect import bisect_left
+from collections import Counter
+from itertools import islice
+from operator import itemgetter
+
+
+TOKEN = re.compile(r"\w+")
+# Quoted parts of a query are phrases, the rest are single terms
+QUERY = re.compile(r'"([^"]*)"|(\S+)')
+RESULT_LIMIT = 50
+SWITCHER_LIMIT = 20
+# Part of the trigrams of a quick switcher query which a title must share
+MIN_TRIGRAM_SHARE = 0.5
+# Number of candidates ranked per result of the quick switcher
+CANDIDATE_FACTOR = 8
+# Postings counted per quick switcher query, so a keystroke stays within a
+# frame whatever the size of the index
+SCAN_LIMIT = 20000
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+def task_text(title, description, labels):
+    # Labels are trello label dicts, or plain strings
+    names = []
+    for label in labels or ():
+        if isinstance(label, dict):
+            label = label.get("name") or ""
+        names.append(label)
+    return " ".join([title, description or ""] + names)
+
+
+def parse_query(query):
+    # Returns the list of phrases, every phrase being a list of tokens.
+    # A single term is a phrase of one token.
+    phrases = []
+    for quoted, term in QUERY.findall(query):
+        tokens = tokenize(quoted if term == "" else term)
+        if len(tokens) > 0:
+            phrases.append(tokens)
+    return phrases
+
+
+def contains(tokens, phrase):
+    # Consecutive tokens, the last one may be a prefix of the text
+    n = len(phrase)
+    head = tuple(phrase[:-1])
+    for i in range(len(tokens) - n + 1):
+        if tokens[i:i + n - 1] == head and tokens[i + n - 1].startswith(phrase[-1]):
+            return True
+    return False
+
+
+# Inverted index of the tasks of one board. The vocabulary is kept sorted
+# so prefix lookups are a bisect and a short scan.
+class BoardIndex:
+
+    def __init__(self):
+        # token -> set of task ids
+        self.postings = dict()
+        self.vocabulary = []
+        # task id -> (title, tokens)
+        self.docs = dict()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, task_id, title, text):
+        if task_id in self.docs:
+            self.remove(task_id)
+        tokens = tuple(tokenize(text))
+        self.docs[task_id] = (title, tokens)
+        for token in set(tokens):
+            ids = self.postings.get(token)
+            if ids is None:
+                ids = self.postings[token] = set()
+                self.vocabulary.insert(bisect_left(self.vocabulary, token), token)
+            ids.add(task_id)
+
+    def add_all(self, items):
+        # Bulk version of add() which sorts the vocabulary once
+        for task_id, title, text in items:
+            tokens = tuple(tokenize(text))
+            self.docs[task_id] = (title, tokens)
+            for token in set(tokens):
+                ids = self.postings.get(token)
+                if ids is None:
+                    ids = self.postings[token] = set()
+                ids.add(task_id)
+        self.vocabulary = sorted(self.postings)
+
+    def remove(self, task_id):
+        doc = self.docs.pop(task_id, None)
+        if doc is None:
+            return
+        for token in set(doc[1]):
+            ids = self.postings[token]
+            ids.discard(task_id)
+            if len(ids) == 0:
+                del self.postings[token]
+                del self.vocabulary[bisect_left(self.vocabulary, token)]
+
+    def lookup(self, prefix):
+        # Ids of the tasks having a token starting with prefix
+        start = bisect_left(self.vocabulary, prefix)
+        end = start
+        while end < len(self.vocabulary) and self.vocabulary[end].startswith(prefix):
+            end += 1
+        if end - start == 1:
+            return self.postings[self.vocabulary[start]]
+        result = set()
+        for token in self.vocabulary[start:end]:
+            result |= self.postings[token]
+        return result
+
+    def search(self, phrases, limit):
+        candidates = None
+        # Intersect the smallest sets first, every token of a phrase must
+        # be present (the last one as a prefix)
+        lookups = []
+        for phrase in phrases:
+            for token in phrase[:-1]:
+                lookups.append(self.postings.get(token, ()))
+            lookups.append(self.lookup(phrase[-1]))
+        lookups.sort(key=len)
+        for ids in lookups:
+            if candidates is None:
+                candidates = set(ids)
+            else:
+                candidates &= ids
+            if len(candidates) == 0:
+                return []
+        result = []
+        for task_id in candidates:
+            title, tokens = self.docs[task_id]
+            if all(len(p) == 1 or contains(tokens, p) for p in phrases):
+                result.append((task_id, title))
+                if len(result) == limit:
+                    break
+        return result
+
+
+def trigrams(text):
+    # Words are padded so their first and last letters weigh more
+    text = " " + " ".join(tokenize(text)) + " "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramEntry:
+    # Hashed by identity: a title added again gets a new entry, so stale
+    # entries left in the postings are never counted twice
+    __slots__ = ("key", "title", "grams")
+
+    def __init__(self, key, title):
+        self.key = key
+        self.title = title
+        # Number of trigrams of the title
+        self.grams = 0
+
+
+# Fuzzy lookup of short titles. A title is a candidate if it shares enough
+# trigrams with the query, candidates are ranked by their Dice coefficient
+# in a bounded heap. Only SCAN_LIMIT postings are counted per query, rarest
+# trigrams first. Postings are plain lists, removed entries stay in them
+# until they make up half of the index and everything is rebuilt.
+class TrigramIndex:
+
+    def __init__(self):
+        # trigram -> list of TrigramEntry
+        self.postings = dict()
+        # key -> current TrigramEntry
+        self.entries = dict()
+        self.size = 0
+        self.stale = 0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def add(self, key, title):
+        old = self.entries.get(key)
+        if old is not None:
+            if old.title == title:
+                return
+            self.remove(key)
+        entry = TrigramEntry(key, title)
+        self.entries[key] = entry
+        self.insert(entry)
+
+    def insert(self, entry):
+        grams = trigrams(entry.title)
+        entry.grams = len(grams)
+        for gram in grams:
+            entries = self.postings.get(gram)
+            if entries is None:
+                self.postings[gram] = [entry]
+            else:
+                entries.append(entry)
+            self.size += 1
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.stale += entry.grams
+        if self.stale * 2 > self.size:
+            self.compact()
+
+    def compact(self):
+        self.postings = dict()
+        self.size = 0
+        self.stale = 0
+        for entry in self.entries.values():
+            self.insert(entry)
+
+    def search(self, query, limit):
+        # Returns (key, title) tuples, best match first
+        grams = trigrams(query)
+        if len(query.strip()) < 2 or len(grams) == 0:
+            return []
+        n = len(grams)
+        needed = max(1, int(n * MIN_TRIGRAM_SHARE))
+        # Postings are counted from the rarest trigram on. A title sharing
+        # needed trigrams is in one of the n - needed + 1 rarest postings,
+        # the others are only counted while within SCAN_LIMIT.
+        postings = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+        counts = Counter()
+        budget = SCAN_LIMIT
+        complete = True
+        for i, entries in enumerate(postings):
+            if len(entries) > budget:
+                complete = False
+                if i > n - needed:
+                    break
+            counts.update(islice(entries, max(budget, 0)))
+            budget -= len(entries)
+        # Counts of the scanned trigrams preselect the live entries, the
+        # Dice coefficient of all shared trigrams ranks them
+        entries = self.entries
+        wanted = limit * CANDIDATE_FACTOR
+        # Stale entries are skipped before they take the place of a live
+        # one; they are less than half of the index (see remove)
+        top = counts.most_common(2 * wanted)
+        live = [(e, count) for e, count in top if entries.get(e.key) is e]
+        if len(live) < wanted and len(top) < len(counts):
+            live = [(e, count) for e, count in counts.most_common()
+                    if entries.get(e.key) is e]
+        candidates = []
+        for e, count in live[:wanted]:
+            if not complete:
+                count = len(grams & trigrams(e.title))
+            if count >= needed:
+                candidates.append((2 * count / (n + e.grams), e))
+        best = heapq.nlargest(limit, candidates, key=itemgetter(0))
+        return [(e.key, e.title) for score, e in best]
+
+
+# Search over the tasks of all boards. Loaded boards are followed through
+# their signals, the others are read from storage without being loaded
+# into the catalog, one per idle call (index_next) or all at once when
+# searching before the background indexing finished. Board names and task
+# titles are also kept in a trigram index for the quick switcher.
+class SearchIndex:
+
+    def __init__(self, settings):
+        self.settings = settings
+        # board title -> BoardIndex
+        self.boards = dict()
+        # board title -> (board, handler ids)
+        self.handlers = dict()
+        self.pending = []
+        # (board title, task id or None for the board itself) -> title
+        self.names = TrigramIndex()
+        settings.boards.watchers.append(self.watch)
+        for title, board in settings.boards.loaded_items():
+            self.watch(board)
+        self.add_titles()
+
+    def add_titles(self):
+        # Queues the boards of the catalog which are not indexed yet
+        for title in self.settings.boards:
+            if (title, None) not in self.names:
+                self.names.add((title, None), title)
+            if title not in self.boards and title not in self.pending:
+                self.pending.append(title)
+
+    def watch(self, board):
+        # Called by the catalog whenever a board is loaded or replaced
+        title = board.title
+        if title in self.handlers:
+            old, handlers = self.handlers.pop(title)
+            for handler in handlers:
+                old.disconnect(handler)
+        self.index_tasks(title, ((t.id, t.title, self.get_text(t))
+                                 for l in board.tasklists for t in l.tasks))
+        index = self.boards[title]
+        handlers = [board.connect("inserted", self.on_inserted, index),
+                    board.connect("updated", self.on_inserted, index),
+                    board.connect("removed", self.on_removed, index),
+                    board.connect("list-added", self.on_list_added, index)]
+        self.handlers[title] = (board, handlers)
+        if title in self.pending:
+            self.pending.remove(title)
+
+    @staticmethod
+    def get_text(task):
+        return task_text(task.title, task.get_field("description"),
+                         task.get_field("labels"))
+
+    def on_inserted(self, board, tasklist, task, *args):
+        index = args[-1]
+        index.add(task.id, task.title, self.get_text(task))
+        self.names.add((board.title, task.id), task.title)
+
+    def on_removed(self, board, tasklist, task, position, index):
+        index.remove(task.id)
+        self.names.remove((board.title, task.id))
+
+    def on_list_added(self, board, tasklist, index):
+        for t in tasklist.tasks:
+            index.add(t.id, t.title, self.get_text(t))
+            self.names.add((board.title, t.id), t.title)
+
+    def index_tasks(self, title, items):
+        # items are (task id, task title, text) tuples
+        items = list(items)
+        old = self.boards.get(title)
+        if old is not None:
+            # Titles which did not change keep their entries
+            current = {task_id for task_id, task_title, text in items}
+            for task_id in old.docs:
+                if task_id not in current:
+                    self.names.remove((title, task_id))
+        if (title, None) not in self.names:
+            self.names.add((title, None), title)
+        index = BoardIndex()
+        index.add_all(items)
+        for task_id, task_title, text in items:
+            self.names.add((title, task_id), task_title)
+        self.boards[title] = index
+
+    def index_board(self, title):
+        self.index_tasks(title, (
+            (task_id, task_title, task_text(task_title, description, labels))
+            for task_id, task_title, description, labels
+            in self.settings.storage.read_tasks(title)))
+
+    def index_next(self):
+        # Indexes one pending board, for GLib.idle_add
+        while len(self.pending) > 0:
+            title = self.pending.pop(0)
+            if title in self.settings.boards and title not in self.boards:
+                self.index_board(title)
+                break
+        return len(self.pending) > 0
+
+    def search(self, query, limit=RESULT_LIMIT):
+        # Returns (board title, task id, task title) tuples
+        phrases = parse_query(query)
+        if len(phrases) == 0:
+            return []
+        while self.index_next():
+            pass
+        result = []
+        for title in self.settings.boards:
+            index = self.boards.get(title)
+            if index is None:
+                continue
+            for task_id, task_title in index.search(phrases, limit - len(result)):
+                result.append((title, task_id, task_title))
+            if len(result) >= limit:
+                break
+        return result
+
+    def switch(self, query, limit=SWITCHER_LIMIT):
+        # Fuzzy match of board names and task titles for the quick switcher.
+        # Returns (board title, task id or None, title) tuples, best first.
+        # Boards still waiting for the background indexing are not waited
+        # for, every keystroke has to answer within a frame.
+        return [(key[0], key[1], title)
+                for key, title in self.names.search(query, limit)
+                if key[0] in self.settings.boards]
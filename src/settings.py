@@ -27,76 +27,68 @@
 # authorization.
 
 import os
-import sys
-import json
-import pickle
+from collections.abc import MutableMapping
 
 from .Board import Board
 from .TaskList import TaskList
-from .Task import Task, DueDate
+from .Task import Task
+from .json_storage import JsonStorage
+from .sqlite_storage import SqliteStorage
+from . import profiling
+
+
+CONFIG_DIR = os.path.expanduser("~/.config/kanban/")
+
+
+def create_storage(name, config_dir, migrate=False):
+    if name == "sqlite":
+        storage = SqliteStorage(config_dir)
+        if migrate:
+            storage.migrate()
+        return storage
+    return JsonStorage(config_dir, journal=True)
 
 
 class KanbanSettings:
 
-    def __init__(self, config_dir):
-        self.boards = dict()
+    def __init__(self, config_dir, storage=None, lazy=False):
         self.config_dir = config_dir
+        if storage is None:
+            storage = JsonStorage(config_dir)
+        self.storage = storage
+        self.lazy = lazy
+        self.boards = BoardCatalog(storage)
 
     def add_board(self, board):
         self.boards[board.title] = board
 
-    def save(self):
-        if not os.path.exists(self.config_dir):
-            os.makedirs(self.config_dir)
-        for key, b in self.boards.items():
-            config_path = self.config_dir + key + ".json"
-            print("save to", config_path)
-            with open(config_path, "w") as f:
-                json.dump(b, f, cls=BoardEncoder)
-
-    def load(self):
-        if not os.path.exists(self.config_dir) or len(os.listdir(self.config_dir)) == 0:
-            self.set_default()
+    @profiling.timed("KanbanSettings.save")
+    def save(self, exclude=()):
+        # Boards which were never loaded cannot have been modified
+        for key, b in list(self.boards.loaded_items()):
+            if b.is_modified() and key not in exclude:
+                self.save_board(key)
+
+    def save_board(self, title):
+        profiling.count("boards saved")
+        b = self.boards[title]
+        self.storage.save_board(b)
+        b.mark_saved()
+
+    @profiling.timed("KanbanSettings.load")
+    def load(self, default=True):
+        # Without boards, the app starts with an example board unless
+        # default is False
+        titles = self.storage.list_boards()
+        if len(titles) == 0:
+            if default:
+                self.set_default()
             return
-        for filename in os.listdir(self.config_dir):
-            config_path = self.config_dir + filename
-            filepath, file_extension = os.path.splitext(config_path)
-            if file_extension == ".json":
-                self.load_json(config_path)
-            elif file_extension == ".pkl":
-                # Old configuration
-                json_equivalent = filepath + ".json"
-                print("old configuration detected", config_path)
-                if os.path.exists(json_equivalent):
-                    print("new configuration for the same board is present - old configuration ignored.")
-                else:
-                    print("converting", config_path, "to json...")
-                    self.load_pkl(config_path)
-                    self.save()
-                    if not os.path.exists(json_equivalent):
-                        raise RuntimeError("Converting error " + config_path)
-
-    def load_json(self, filepath):
-        print("load from", filepath)
-        with open(filepath, "r") as f:
-            board = json.JSONDecoder(
-                object_hook=decodeBoard).decode(f.read())
-            print("load", board.title, "from", filepath)
-            self.add_board(board)
-
-    def load_pkl(self, filepath):
-        # Trick pickle to think that there is 'model' module
-        sys.modules['model'] = sys.modules['kanban']
-        with open(filepath, "rb") as f:
-            board = pickle.load(f)
-            print("load", board.title, "from", filepath)
-            newboard = Board(board.title)
-            # Old configuration has hardcoded dict of tasklists
-            newboard.add(board.tasklists["Backlog"])
-            newboard.add(board.tasklists["Ready"])
-            newboard.add(board.tasklists["Doing"])
-            newboard.add(board.tasklists["Done"])
-            self.add_board(newboard)
+        for title in titles:
+            if self.lazy:
+                self.boards.add_title(title)
+            else:
+                self.add_board(self.storage.load_board(title))
 
     def set_default(self):
         b = Board("Work")
@@ -109,25 +101,174 @@ class KanbanSettings:
         self.add_board(b)
 
 
-class BoardEncoder(json.JSONEncoder):
+# Mapping of board titles to boards which parses a board only when it is
+# first accessed. Iterating over it yields titles without loading anything.
+class BoardCatalog(MutableMapping):
+
+    def __init__(self, storage):
+        self.storage = storage
+        # title -> Board, or None while the board is not loaded yet
+        self.entries = dict()
+        # Called with every board which is loaded or added
+        self.watchers = []
+
+    def add_title(self, title):
+        if title not in self.entries:
+            self.entries[title] = None
+
+    def is_loaded(self, title):
+        return self.entries.get(title) is not None
+
+    def unload(self, title):
+        # Drops the board from memory, it is read from storage again on the
+        # next access. Boards which were never saved are forgotten.
+        if title in self.storage.list_boards():
+            self.entries[title] = None
+        else:
+            self.entries.pop(title, None)
+
+    def loaded_items(self):
+        return ((k, b) for k, b in self.entries.items() if b is not None)
+
+    def __getitem__(self, title):
+        board = self.entries[title]
+        if board is None:
+            with profiling.span("BoardCatalog.load_board"):
+                board = self.storage.load_board(title)
+            self.entries[title] = board
+            self.notify(board)
+        return board
+
+    def __setitem__(self, title, board):
+        self.entries[title] = board
+        self.notify(board)
+
+    def notify(self, board):
+        for watcher in self.watchers:
+            watcher(board)
+
+    def __delitem__(self, title):
+        del self.entries[title]
+
+    def __contains__(self, title):
+        return title in self.entries
+
+    def __iter__(self):
+        return iter(self.entries)
 
-    def default(self, b):
-        return b.__dict__
+    def __len__(self):
+        return len(self.entries)
 
 
-def decodeBoard(d):
-    o = None
-    if 'day' in d:
-        o = DueDate(0, 0, 0)
-    elif not 'title' in d:
-        return o
+# Coalesces bursts of modifications into a single save. Timer functions are
+# passed in (GLib.timeout_add/source_remove in the app) to keep this module
+# free of GTK. Every loaded board is watched, so changes made by views,
+# importers or scripts are all saved.
+class AutosaveScheduler:
 
-    if 'creation_date' in d:
-        o = Task(d['title'])
-    if 'tasks' in d:
-        o = TaskList(d['title'])
-    if 'tasklists' in d:
-        o = Board(d['title'])
-    for p in d:
-        setattr(o, p, d[p])
-    return o
+    def __init__(self, settings, timeout_add, source_remove, delay=500):
+        self.settings = settings
+        self.timeout_add = timeout_add
+        self.source_remove = source_remove
+        self.delay = delay
+        self.dirty = set()
+        self.source = None
+        # Titles of boards which must not be saved for now
+        self.held = set()
+        # title -> (board, handler id)
+        self.watched = dict()
+        settings.boards.watchers.append(self.watch)
+        for title, board in settings.boards.loaded_items():
+            self.watch(board)
+
+    def watch(self, board):
+        if board.title in self.watched:
+            old, handler = self.watched[board.title]
+            old.disconnect(handler)
+        handler = board.connect("changed", lambda b, change: self.mark_dirty(b.title))
+        self.watched[board.title] = (board, handler)
+        if board.is_modified():
+            self.mark_dirty(board.title)
+
+    def mark_dirty(self, title):
+        profiling.count("autosave changes")
+        self.dirty.add(title)
+        if title in self.held:
+            # Saved once released
+            return
+        # Restart the quiet period on every change
+        self.cancel()
+        self.source = self.timeout_add(self.delay, self.on_timeout)
+
+    def hold(self, title):
+        self.held.add(title)
+
+    def release(self, title):
+        self.held.discard(title)
+        if title in self.dirty:
+            self.mark_dirty(title)
+
+    def cancel(self):
+        if self.source is not None:
+            self.source_remove(self.source)
+            self.source = None
+
+    def on_timeout(self):
+        self.source = None
+        self.flush()
+        return False
+
+    def flush(self):
+        self.cancel()
+        self.dirty &= self.held
+        # Only boards modified since the last save are written
+        self.settings.save(exclude=self.held)
+
+
+# Keeps the last window geometry reported while the window is moved or
+# resized and writes it once no new one came for delay ms, instead of a
+# GSettings write for every configure event.
+class GeometryWriter:
+
+    def __init__(self, write, timeout_add, source_remove, delay=500):
+        self.write = write
+        self.timeout_add = timeout_add
+        self.source_remove = source_remove
+        self.delay = delay
+        self.state = None
+        self.written = None
+        self.source = None
+        self.writes = 0
+        # Updates which were replaced by a newer one or did not change
+        # anything, each would have been a write without the delay
+        self.avoided = 0
+
+    def update(self, state):
+        if self.source is not None:
+            self.source_remove(self.source)
+            self.skip()
+        self.state = state
+        self.source = self.timeout_add(self.delay, self.on_timeout)
+
+    def skip(self):
+        self.avoided += 1
+        profiling.count("geometry writes avoided")
+
+    def on_timeout(self):
+        self.source = None
+        self.write_state()
+        return False
+
+    def flush(self):
+        if self.source is not None:
+            self.source_remove(self.source)
+            self.source = None
+            self.write_state()
+
+    def write_state(self):
+        if self.state == self.written:
+            self.skip()
+            return
+        self.write(*self.state)
+        self.written = self.state
+        self.writes += 1
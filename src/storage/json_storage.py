@@ -0,0 +1,396 @@
+# json_storage.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import gc
+import os
+import json
+import pickle
+from datetime import date
+
+from .Board import Board
+from .TaskList import TaskList
+from .Task import Task, DueDate
+from .storage import Storage
+from .json_stream import JsonStream
+
+
+# Version of the board file format, saved in its "version" field
+FORMAT_VERSION = 4
+
+TASK_FIELDS = ("id", "order", "title", "creation_date", "update_date", "due_date")
+
+# Size in bytes after which a board journal is folded into a new snapshot
+JOURNAL_LIMIT = 1024 * 1024
+
+
+# One <title>.json snapshot per board, optionally followed by an append-only
+# <title>.journal of the changes made since that snapshot
+class JsonStorage(Storage):
+
+    def __init__(self, config_dir, journal=False, journal_limit=JOURNAL_LIMIT):
+        self.config_dir = config_dir
+        self.journal = journal
+        self.journal_limit = journal_limit
+        # Boards whose on-disk snapshot matches them (journal can be appended)
+        self.stored = dict()
+
+    def list_boards(self):
+        if not os.path.exists(self.config_dir):
+            return []
+        self.recover()
+        self.convert_pkl()
+        titles = []
+        for filename in sorted(os.listdir(self.config_dir)):
+            title, file_extension = os.path.splitext(filename)
+            if file_extension == ".json":
+                titles.append(title)
+        return titles
+
+    def load_board(self, title):
+        filepath = self.config_dir + title + ".json"
+        print("load from", filepath)
+        with open(filepath, "r") as f:
+            board, version = stream_board(f)
+            print("load", board.title, "from", filepath)
+        journal_path = self.config_dir + title + ".journal"
+        if os.path.exists(journal_path):
+            self.replay_journal(board, journal_path)
+            if os.path.getsize(journal_path) > self.journal_limit:
+                self.save_snapshot(board)
+        if version < FORMAT_VERSION:
+            # Persist the task ids and order keys generated for an older file
+            self.save_snapshot(board)
+        self.stored[board.title] = board
+        return board
+
+    def read_tasks(self, title):
+        # Only the searchable fields of the snapshot and journal, without
+        # building the board or writing the files
+        filepath = self.config_dir + title + ".json"
+        with open(filepath, "r") as f:
+            data = json.load(f)
+        if data.get("version", 1) < 3:
+            # Written before task ids, which are generated and saved on load
+            yield from Storage.read_tasks(self, title)
+            return
+        tasks = dict()
+        for l in data["tasklists"]:
+            for t in l["tasks"]:
+                tasks[t["id"]] = t
+        del data
+        journal_path = self.config_dir + title + ".journal"
+        if os.path.exists(journal_path):
+            with open(journal_path, "r") as f:
+                for line in f:
+                    try:
+                        change = json.loads(line)
+                    except ValueError:
+                        # Torn write at the end of the journal
+                        break
+                    op = change["op"]
+                    if op == "insert" or op == "update":
+                        tasks[change["task"]["id"]] = change["task"]
+                    elif op == "remove":
+                        tasks.pop(change["id"], None)
+                    elif op == "add_list":
+                        for t in change["tasklist"]["tasks"]:
+                            tasks[t["id"]] = t
+        for task_id, t in tasks.items():
+            yield task_id, t["title"], t.get("description"), t.get("labels")
+
+    def save_board(self, board):
+        if not os.path.exists(self.config_dir):
+            os.makedirs(self.config_dir)
+        if self.journal and self.stored.get(board.title) is board:
+            self.append_journal(board)
+        else:
+            self.save_snapshot(board)
+
+    def append_journal(self, board):
+        journal_path = self.config_dir + board.title + ".journal"
+        print("append to", journal_path)
+        with open(journal_path, "a") as f:
+            for change in board.pending_changes():
+                f.write(json.dumps(change, cls=BoardEncoder) + "\n")
+            size = f.tell()
+        if size > self.journal_limit:
+            self.save_snapshot(board)
+
+    def save_snapshot(self, board):
+        config_path = self.config_dir + board.title + ".json"
+        journal_path = self.config_dir + board.title + ".journal"
+        tmp_path = config_path + ".tmp"
+        print("save to", config_path)
+        with open(tmp_path, "w") as f:
+            json.dump(board, f, cls=BoardEncoder)
+            f.flush()
+            os.fsync(f.fileno())
+        # The complete snapshot replaces the journal; see recover()
+        if os.path.exists(journal_path):
+            os.remove(journal_path)
+        os.replace(tmp_path, config_path)
+        self.stored[board.title] = board
+
+    def recover(self):
+        for filename in os.listdir(self.config_dir):
+            if not filename.endswith(".json.tmp"):
+                continue
+            tmp_path = self.config_dir + filename
+            config_path = tmp_path[:-len(".tmp")]
+            journal_path = config_path[:-len(".json")] + ".journal"
+            if not os.path.exists(journal_path) and self.is_valid_json(tmp_path):
+                print("recover interrupted save", config_path)
+                os.replace(tmp_path, config_path)
+            else:
+                os.remove(tmp_path)
+
+    def is_valid_json(self, filepath):
+        try:
+            with open(filepath, "r") as f:
+                json.load(f)
+        except ValueError:
+            return False
+        return True
+
+    def replay_journal(self, board, journal_path):
+        print("replay", journal_path)
+        with open(journal_path, "r") as f:
+            for line in f:
+                try:
+                    change = json.loads(line)
+                except ValueError:
+                    # Torn write at the end of the journal
+                    print("ignore corrupted entry in", journal_path)
+                    break
+                apply_change(board, change)
+        board.mark_saved()
+
+    def convert_pkl(self):
+        for filename in os.listdir(self.config_dir):
+            config_path = self.config_dir + filename
+            filepath, file_extension = os.path.splitext(config_path)
+            if file_extension != ".pkl":
+                continue
+            # Old configuration
+            json_equivalent = filepath + ".json"
+            print("old configuration detected", config_path)
+            if os.path.exists(json_equivalent):
+                print("new configuration for the same board is present - old configuration ignored.")
+            else:
+                print("converting", config_path, "to json...")
+                self.save_snapshot(self.load_pkl(config_path))
+                if not os.path.exists(json_equivalent):
+                    raise RuntimeError("Converting error " + config_path)
+
+    def load_pkl(self, filepath):
+        with open(filepath, "rb") as f:
+            board = LegacyUnpickler(f).load()
+            print("load", board.title, "from", filepath)
+            newboard = Board(board.title)
+            # Old configuration has hardcoded dict of tasklists
+            for listname in "Backlog Ready Doing Done".split():
+                # The pickled lists predate the attributes of TaskList
+                tasklist = TaskList(listname)
+                for t in board.tasklists[listname].tasks:
+                    t._tasklist = tasklist
+                    tasklist.tasks.append(t)
+                tasklist.spread_keys()
+                newboard.add(tasklist)
+            return newboard
+
+
+# Old configurations were pickled with the classes of a 'model' package,
+# which are the modules of this package now
+class LegacyUnpickler(pickle.Unpickler):
+
+    def find_class(self, module, name):
+        if module == "model" or module.startswith("model."):
+            module = __package__ + module[len("model"):]
+        return super().find_class(module, name)
+
+
+class BoardEncoder(json.JSONEncoder):
+
+    def default(self, b):
+        if isinstance(b, (Task, DueDate)):
+            return b.to_dict()
+        d = dict()
+        if isinstance(b, Board):
+            d["version"] = FORMAT_VERSION
+        # Skip private bookkeeping (parent links, revisions)
+        for k, v in b.__dict__.items():
+            if not k.startswith("_"):
+                d[k] = v
+        return d
+
+
+def apply_change(board, change):
+    op = change["op"]
+    if op == "add_list":
+        board.add(decodeTaskList(change["tasklist"]))
+        return
+    # Entries written before task ids only have positions
+    task, tasklist = board.find_task(change.get("id"))
+    if tasklist is None:
+        tasklist = board.tasklists[change["list"]]
+    if op == "insert":
+        tasklist.insert(change["index"], decodeTask(change["task"]))
+    elif op == "remove":
+        tasklist.remove(task_index(tasklist, task, change["index"]))
+    elif op == "move":
+        task.order = change["order"]
+        tasklist.move(task_index(tasklist, task, change["from"]), change["index"])
+    elif op == "transfer":
+        task.order = change["order"]
+        tasklist.transfer(task_index(tasklist, task, change["from"]),
+                          board.tasklists[change["list"]], change["index"])
+    elif op == "rebalance":
+        for task_id, order in change["orders"]:
+            board.find_task(task_id)[0].order = order
+    elif op == "update":
+        if task is None:
+            task = tasklist.tasks[change["index"]]
+        task.copy_from(decodeTask(change["task"]))
+
+
+def task_index(tasklist, task, index):
+    # Position recorded in the journal, checked against the task id
+    tasks = tasklist.tasks
+    if task is not None and (index >= len(tasks) or tasks[index] is not task):
+        index = tasks.index(task)
+    return index
+
+
+# Builds the model directly from the known structure of a board file
+# (version 1 files have no "version" field but the same layout)
+def decodeBoard(d):
+    version = d.get("version", 1)
+    if version > FORMAT_VERSION:
+        raise ValueError("Unsupported board format version %d" % version)
+    board = Board(d["title"])
+    # Creating many small objects triggers cyclic GC passes which find
+    # nothing to collect but dominate the decoding time of large boards
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        tasklists = d["tasklists"]
+        for i in range(len(tasklists)):
+            tasklist = decodeTaskList(tasklists[i])
+            # Each list's dicts are freed once converted, so the whole dict
+            # tree and the whole model are not held at the same time
+            tasklists[i] = None
+            tasklist._board = board
+            board.tasklists.append(tasklist)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    board.rebuild_index()
+    return board
+
+
+# Reads a board file task by task, so the dicts of the whole file are never
+# held at once. Returns the board and the version of the file.
+def stream_board(f):
+    stream = JsonStream(f)
+    title = None
+    version = 1
+    tasklists = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for name in stream.iter_members():
+            if name == "title":
+                title = stream.decode_value()
+            elif name == "version":
+                version = stream.decode_value()
+                if version > FORMAT_VERSION:
+                    raise ValueError("Unsupported board format version %d" % version)
+            elif name == "tasklists":
+                for i in stream.iter_elements():
+                    tasklists.append(stream_tasklist(stream))
+            else:
+                stream.skip_value()
+    finally:
+        if gc_enabled:
+            gc.enable()
+    board = Board(title)
+    for tasklist in tasklists:
+        tasklist._board = board
+        board.tasklists.append(tasklist)
+    board.rebuild_index()
+    return board, version
+
+
+def stream_tasklist(stream):
+    tasklist = TaskList(None)
+    tasks = tasklist.tasks
+    for name in stream.iter_members():
+        if name == "title":
+            tasklist.title = stream.decode_value()
+        elif name == "tasks":
+            for d in stream.iter_array():
+                task = decodeTask(d)
+                task._tasklist = tasklist
+                tasks.append(task)
+        else:
+            stream.skip_value()
+    if len(tasks) > 0 and tasks[0].order is None:
+        # Written before order keys
+        tasklist.spread_keys()
+    return tasklist
+
+
+def decodeTaskList(d):
+    tasklist = TaskList(d["title"])
+    tasks = tasklist.tasks
+    dicts = d["tasks"]
+    for i in range(len(dicts)):
+        task = decodeTask(dicts[i])
+        dicts[i] = None
+        task._tasklist = tasklist
+        tasks.append(task)
+    if len(tasks) > 0 and tasks[0].order is None:
+        # Written before order keys
+        tasklist.spread_keys()
+    return tasklist
+
+
+def decodeTask(d):
+    due = d.get("due_date")
+    if due is not None:
+        due = date(due["year"], due["month"], due["day"]).toordinal()
+    else:
+        due = 0
+    task = Task(d["title"], d.get("creation_date"), d.get("update_date"), due,
+                d.get("id"), d.get("order"))
+    if len(d) > len(TASK_FIELDS):
+        # Optional fields, e.g. added by the trello importer
+        for k, v in d.items():
+            if k not in TASK_FIELDS:
+                task.set_field(k, v)
+    return task
@@ -0,0 +1,289 @@
+# sqlite_storage.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import os
+import json
+import sqlite3
+
+from .Board import Board
+from .TaskList import TaskList
+from .Task import Task
+from .order_keys import spread_keys
+from .storage import Storage
+from .json_storage import JsonStorage, BoardEncoder, TASK_FIELDS
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS boards (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS lists (
+    id INTEGER PRIMARY KEY,
+    board_id INTEGER NOT NULL REFERENCES boards(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    -- the task id and order key of the model
+    id INTEGER PRIMARY KEY,
+    list_id INTEGER NOT NULL REFERENCES lists(id) ON DELETE CASCADE,
+    sort_key TEXT NOT NULL,
+    title TEXT NOT NULL,
+    creation_date REAL,
+    update_date REAL,
+    due_date INTEGER,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS lists_order ON lists(board_id, position);
+CREATE INDEX IF NOT EXISTS tasks_order ON tasks(list_id, sort_key);
+CREATE INDEX IF NOT EXISTS tasks_due ON tasks(due_date)
+    WHERE due_date IS NOT NULL;
+"""
+
+TASK_COLUMNS = "id, sort_key, title, creation_date, update_date, due_date, extra"
+
+
+# Boards, lists and tasks stored as rows of a single kanban.db. Saving a
+# board that was loaded from (or already written to) the database applies
+# its pending changes as single-row statements in one transaction; tasks
+# are ordered by their order key so a move updates one row.
+class SqliteStorage(Storage):
+
+    def __init__(self, config_dir, filename="kanban.db"):
+        self.config_dir = config_dir
+        self.path = config_dir + filename
+        self.db = None
+        self.stored = dict()
+
+    def connect(self):
+        if self.db is None:
+            if not os.path.exists(self.config_dir):
+                os.makedirs(self.config_dir)
+            self.db = sqlite3.connect(self.path)
+            self.db.execute("PRAGMA foreign_keys = ON")
+            upgrade = self.has_task_positions()
+            if upgrade:
+                self.db.executescript(
+                    "DROP INDEX tasks_order; DROP INDEX tasks_due; "
+                    "ALTER TABLE tasks RENAME TO tasks_positions;")
+            self.db.executescript(SCHEMA)
+            if upgrade:
+                self.upgrade_task_positions()
+        return self.db
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def has_task_positions(self):
+        columns = [r[1] for r in self.db.execute("PRAGMA table_info(tasks)")]
+        return "position" in columns
+
+    def upgrade_task_positions(self):
+        # Databases written before order keys ordered tasks by position
+        print("add order keys to", self.path)
+        with self.db:
+            rows = self.db.execute(
+                "SELECT list_id, id, title, creation_date, update_date, due_date, extra "
+                "FROM tasks_positions ORDER BY list_id, position").fetchall()
+            keys = []
+            start = 0
+            for i in range(1, len(rows) + 1):
+                if i == len(rows) or rows[i][0] != rows[start][0]:
+                    keys.extend(spread_keys(i - start))
+                    start = i
+            self.db.executemany(
+                "INSERT INTO tasks (list_id, " + TASK_COLUMNS + ") VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(r[0], r[1], k) + r[2:] for r, k in zip(rows, keys)])
+            self.db.execute("DROP TABLE tasks_positions")
+
+    def migrate(self):
+        # Import boards from the json (and legacy pkl) configuration. Only
+        # done when the app is set to use sqlite, since the json files are
+        # renamed afterwards.
+        json_storage = JsonStorage(self.config_dir)
+        titles = json_storage.list_boards()
+        if len(titles) == 0:
+            return
+        db = self.connect()
+        with db:
+            for title in titles:
+                board = json_storage.load_board(title)
+                if self.get_board_id(board.title) is None:
+                    print("migrate", board.title, "to", self.path)
+                    self.write_board(board)
+        for filename in os.listdir(self.config_dir):
+            if os.path.splitext(filename)[1] in (".json", ".journal", ".pkl"):
+                path = self.config_dir + filename
+                os.replace(path, path + ".migrated")
+
+    def list_boards(self):
+        db = self.connect()
+        return [r[0] for r in db.execute("SELECT title FROM boards ORDER BY title")]
+
+    def load_board(self, title):
+        db = self.connect()
+        board_id = self.get_board_id(title)
+        board = Board(title)
+        lists = dict()
+        for list_id, list_title in db.execute(
+                "SELECT id, title FROM lists WHERE board_id = ? ORDER BY position",
+                (board_id,)):
+            tasklist = TaskList(list_title)
+            tasklist._board = board
+            board.tasklists.append(tasklist)
+            lists[list_id] = tasklist
+        for row in db.execute(
+                "SELECT t.list_id, t.id, t.sort_key, t.title, t.creation_date, t.update_date, t.due_date, t.extra "
+                "FROM tasks t JOIN lists l ON t.list_id = l.id "
+                "WHERE l.board_id = ? ORDER BY t.list_id, t.sort_key", (board_id,)):
+            tasklist = lists[row[0]]
+            task = row_to_task(row[1:])
+            task._tasklist = tasklist
+            tasklist.tasks.append(task)
+        board.rebuild_index()
+        self.stored[title] = board
+        return board
+
+    def save_board(self, board):
+        db = self.connect()
+        with db:
+            if self.stored.get(board.title) is board:
+                board_id = self.get_board_id(board.title)
+                for change in board.pending_changes():
+                    self.apply_change(board_id, change)
+            else:
+                self.write_board(board)
+        self.stored[board.title] = board
+
+    def read_tasks(self, title):
+        db = self.connect()
+        for task_id, task_title, extra in db.execute(
+                "SELECT t.id, t.title, t.extra "
+                "FROM tasks t JOIN lists l ON t.list_id = l.id JOIN boards b ON l.board_id = b.id "
+                "WHERE b.title = ?", (title,)):
+            if extra is None:
+                yield task_id, task_title, None, None
+            else:
+                extra = json.loads(extra)
+                yield task_id, task_title, extra.get("description"), extra.get("labels")
+
+    def find_due(self, until):
+        db = self.connect()
+        result = []
+        for row in db.execute(
+                "SELECT b.title, l.title, t.id, t.sort_key, t.title, t.creation_date, t.update_date, t.due_date, t.extra "
+                "FROM tasks t JOIN lists l ON t.list_id = l.id JOIN boards b ON l.board_id = b.id "
+                "WHERE t.due_date IS NOT NULL AND t.due_date <= ? ORDER BY t.due_date",
+                (until.toordinal(),)):
+            result.append((row[0], row[1], row_to_task(row[2:])))
+        return result
+
+    def get_board_id(self, title):
+        row = self.db.execute(
+            "SELECT id FROM boards WHERE title = ?", (title,)).fetchone()
+        return None if row is None else row[0]
+
+    def get_list_id(self, board_id, position):
+        return self.db.execute(
+            "SELECT id FROM lists WHERE board_id = ? AND position = ?",
+            (board_id, position)).fetchone()[0]
+
+    def write_board(self, board):
+        print("save", board.title, "to", self.path)
+        self.db.execute("DELETE FROM boards WHERE title = ?", (board.title,))
+        board_id = self.db.execute(
+            "INSERT INTO boards (title) VALUES (?)", (board.title,)).lastrowid
+        for position, tasklist in enumerate(board.tasklists):
+            self.insert_list(board_id, position, tasklist.to_dict())
+
+    def insert_list(self, board_id, position, tasklist):
+        list_id = self.db.execute(
+            "INSERT INTO lists (board_id, position, title) VALUES (?, ?, ?)",
+            (board_id, position, tasklist["title"])).lastrowid
+        self.db.executemany(
+            "INSERT OR REPLACE INTO tasks (list_id, " + TASK_COLUMNS + ") VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(list_id,) + task_to_row(t) for t in tasklist["tasks"]])
+
+    def apply_change(self, board_id, change):
+        op = change["op"]
+        if op == "add_list":
+            position = self.db.execute(
+                "SELECT COUNT(*) FROM lists WHERE board_id = ?", (board_id,)).fetchone()[0]
+            self.insert_list(board_id, position, change["tasklist"])
+            return
+        if op == "insert":
+            # A task moved from another board may still have its old row
+            self.db.execute(
+                "INSERT OR REPLACE INTO tasks (list_id, " + TASK_COLUMNS + ") VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.get_list_id(board_id, change["list"]),) + task_to_row(change["task"]))
+        elif op == "remove":
+            # Unless the task was inserted in another board saved first
+            self.db.execute(
+                "DELETE FROM tasks WHERE id = ? AND list_id IN (SELECT id FROM lists WHERE board_id = ?)",
+                (change["id"], board_id))
+        elif op == "move":
+            self.db.execute(
+                "UPDATE tasks SET sort_key = ? WHERE id = ?", (change["order"], change["id"]))
+        elif op == "transfer":
+            self.db.execute(
+                "UPDATE tasks SET list_id = ?, sort_key = ? WHERE id = ?",
+                (self.get_list_id(board_id, change["list"]), change["order"], change["id"]))
+        elif op == "rebalance":
+            self.db.executemany(
+                "UPDATE tasks SET sort_key = ? WHERE id = ?",
+                [(order, task_id) for task_id, order in change["orders"]])
+        elif op == "update":
+            task_id, *values = task_to_row(change["task"])
+            self.db.execute(
+                "UPDATE tasks SET sort_key = ?, title = ?, creation_date = ?, update_date = ?, due_date = ?, extra = ? "
+                "WHERE id = ?", (*values, task_id))
+
+
+def task_to_row(task):
+    due = task["due_date"]
+    if due is not None:
+        due = due.to_ordinal()
+    extra = {k: v for k, v in task.items() if k not in TASK_FIELDS}
+    if len(extra) > 0:
+        extra = json.dumps(extra, cls=BoardEncoder)
+    else:
+        extra = None
+    return (task["id"], task["order"], task["title"], task["creation_date"],
+            task["update_date"], due, extra)
+
+
+def row_to_task(row):
+    task_id, order, title, creation_date, update_date, due, extra = row
+    task = Task(title, creation_date, update_date, due or 0, task_id, order)
+    if extra is not None:
+        for k, v in json.loads(extra).items():
+            task.set_field(k, v)
+    return task
@@ -0,0 +1,61 @@
+# storage.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+# Interface of the board persistence backends used by KanbanSettings
+class Storage:
+
+    def list_boards(self):
+        raise NotImplementedError
+
+    def load_board(self, title):
+        raise NotImplementedError
+
+    def save_board(self, board):
+        raise NotImplementedError
+
+    def read_tasks(self, title):
+        # Yields (id, title, description, labels) of the tasks of a board
+        # which is not loaded, for the search index. Backends able to read
+        # the fields alone override this.
+        board = self.load_board(title)
+        for l in board.tasklists:
+            for t in l.tasks:
+                yield t.id, t.title, t.get_field("description"), t.get_field("labels")
+
+    def find_due(self, until):
+        # Backends with a due date index override this full scan
+        until = until.toordinal()
+        result = []
+        for title in self.list_boards():
+            board = self.load_board(title)
+            for l in board.tasklists:
+                for t in l.tasks:
+                    due = t.get_due_ordinal()
+                    if due != 0 and due <= until:
+                        result.append((board.title, l.title, t))
+        return result
@@ -26,7 +26,7 @@
 # use or other dealings in this Software without prior written
 # authorization.
 
-from gi.repository import Gtk
+from gi.repository import Gtk, Pango
 from .gi_composites import GtkTemplate
 from .Board import Board
 from .TaskList import TaskList
@@ -57,7 +57,8 @@ class BoardListView(Gtk.ScrolledWindow):
 
     headerbar, \
         button, \
-        list = GtkTemplate.Child().widgets(3)
+        searchentry, \
+        list = GtkTemplate.Child().widgets(4)
 
     def __init__(self, settings, window):
         super().__init__()
@@ -69,6 +70,8 @@ class BoardListView(Gtk.ScrolledWindow):
         self.button.connect("clicked", lambda b: self.create_new_board())
         self.window.set_titlebar(self.headerbar)
 
+        self.searchentry.connect("search-changed", lambda e: self.refresh())
+        self.window.bind_accelerator(self.searchentry, "<Control>f", "grab-focus")
         self.list.connect("row-activated", self.on_row_activated)
         self.refresh()
 
@@ -90,12 +93,20 @@ class BoardListView(Gtk.ScrolledWindow):
     def refresh(self):
         for child in self.list.get_children():
             self.list.remove(child)
-        for board in self.settings.boards:
-            self.list.add(BoardListRow(board))
+        query = self.searchentry.get_text()
+        if query.strip() == "":
+            for board in self.settings.boards:
+                self.list.add(BoardListRow(board))
+        else:
+            for board, task_id, title in self.window.search.search(query):
+                self.list.add(SearchResultRow(board, task_id, title))
         self.show_all()
 
     def on_row_activated(self, listbox, row):
-        self.window.draw_board(row.get_title())
+        if isinstance(row, SearchResultRow):
+            self.window.show_task(row.board, row.task_id)
+        else:
+            self.window.draw_board(row.get_title())
 
 
 class BoardListRow(Gtk.ListBoxRow):
@@ -107,3 +118,20 @@ class BoardListRow(Gtk.ListBoxRow):
 
     def get_title(self):
         return self.title.get_text()
+
+
+class SearchResultRow(Gtk.ListBoxRow):
+
+    def __init__(self, board, task_id, title):
+        super().__init__()
+        self.board = board
+        self.task_id = task_id
+        box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
+        self.title = Gtk.Label(title, xalign=0)
+        self.title.set_ellipsize(Pango.EllipsizeMode.END)
+        box.pack_start(self.title, True, True, 0)
+        box.pack_end(Gtk.Label(board), False, False, 0)
+        self.add(box)
+
+    def get_title(self):
+        return self.title.get_text()
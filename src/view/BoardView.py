@@ -26,9 +26,13 @@
 # use or other dealings in this Software without prior written
 # authorization.
 
-from gi.repository import Gtk, GObject
+from collections import OrderedDict
+from gi.repository import Gtk, GObject, Gio
 from .gi_composites import GtkTemplate
 from .KanbanListView import KanbanListView
+from .TaskView import ROW_MEMORY
+from .due_dates import DueIndex
+from . import profiling
 
 
 @GtkTemplate(ui='/org/gnome/kanban/ui/board.ui')
@@ -42,13 +46,7 @@ class BoardView(Gtk.Box):
         "signal-task-move-bottom": (GObject.SIGNAL_ACTION, None, ()),
         "signal-task-move-left-top": (GObject.SIGNAL_ACTION, None, ()),
         "signal-task-move-right-top": (GObject.SIGNAL_ACTION, None, ()),
-        "signal-exit": (GObject.SIGNAL_ACTION, None, ()),
-        "task-move-up": (GObject.SIGNAL_RUN_FIRST, None, (str,)),
-        "task-move-down": (GObject.SIGNAL_RUN_FIRST, None, (str,)),
-        "task-move-top": (GObject.SIGNAL_RUN_FIRST, None, (str,)),
-        "task-move-bottom": (GObject.SIGNAL_RUN_FIRST, None, (str,)),
-        "task-move-left-top": (GObject.SIGNAL_RUN_FIRST, None, (str,)),
-        "task-move-right-top": (GObject.SIGNAL_RUN_FIRST, None, (str,))
+        "signal-exit": (GObject.SIGNAL_ACTION, None, ())
     }
 
     headerbar, \
@@ -60,6 +58,17 @@ class BoardView(Gtk.Box):
         self.init_template()
         self.board = board
         self.window = window
+        self.lists = []
+        # tasklist -> (position, KanbanListView), rebuilt by refresh()
+        self.views = dict()
+        # Keyboard moves, applied to the list which has the focus only
+        self.commands = {
+            "move-up": lambda l: l.move_up(),
+            "move-down": lambda l: l.move_down(),
+            "move-top": lambda l: l.move_top(),
+            "move-bottom": lambda l: l.move_bottom(),
+            "move-left-top": lambda l: self.move_to_list(l, -1),
+            "move-right-top": lambda l: self.move_to_list(l, 1)}
 
         self.window.bind_accelerator(self, "<Alt>Up", "signal-task-move-up")
         self.window.bind_accelerator(
@@ -73,43 +82,81 @@ class BoardView(Gtk.Box):
         self.window.bind_accelerator(
             self, "<Alt>Right", "signal-task-move-right-top")
         self.window.bind_accelerator(self, "Escape", "signal-exit")
-        self.connect("signal-task-move-up",
-                     lambda w: self.emit("task-move-up", self.get_focus_list_name()))
-        self.connect("signal-task-move-down",
-                     lambda w: self.emit("task-move-down", self.get_focus_list_name()))
-        self.connect("signal-task-move-top",
-                     lambda w: self.emit("task-move-top", self.get_focus_list_name()))
-        self.connect("signal-task-move-bottom",
-                     lambda w: self.emit("task-move-bottom", self.get_focus_list_name()))
-        self.connect("signal-task-move-left-top",
-                     lambda w: self.emit("task-move-left-top", self.get_focus_list_name()))
-        self.connect("signal-task-move-right-top",
-                     lambda w: self.emit("task-move-right-top", self.get_focus_list_name()))
+        for command in self.commands:
+            self.connect("signal-task-" + command,
+                         lambda w, command: self.dispatch(command), command)
         self.connect("signal-exit", self.on_back_clicked)
 
         self.headerbar.props.title = self.window.appname + " \u2013 " + self.board.title
         self.window.set_titlebar(self.headerbar)
         self.returnbutton.connect("clicked", self.on_back_clicked)
 
+        self.due_index = DueIndex(board)
+        self.window.due_dates.watch(self.due_index, self.restyle_tasks)
+        # Lists added later, e.g. by a Trello import into the shown board
+        self.list_handler = board.connect("list-added", lambda b, tasklist: self.refresh())
+
         self.refresh()
 
-    def get_focus_list_name(self):
-        return self.get_focus_child().get_tasklist().get_title()
+    def get_focus_list(self):
+        # TaskListView of the focused list, or None
+        child = self.get_focus_child()
+        if child is None or child not in self.lists:
+            return None
+        return child.get_tasklist()
+
+    def dispatch(self, command):
+        l = self.get_focus_list()
+        if l is not None:
+            self.commands[command](l)
+
+    def move_to_list(self, l, offset):
+        # Moves the selected task of l to the top of the list offset
+        # positions away
+        position = self.views[l.tasklist][0] + offset
+        if position < 0 or position >= len(self.lists):
+            return
+        index = l.get_selected_index()
+        if index is not None:
+            l.move_to_list(self.lists[position].get_tasklist(), index)
 
     def add_tasklist_view(self, tasklist):
         l = KanbanListView(tasklist, self)
-        l.get_tasklist().connect("modified", lambda w: self.window.user_settings.save())
-        self.lists.append(l)
         self.pack_start(l, True, True, 0)
+        return l
 
     def get_list(self, index):
         return self.lists[index]
 
-    def get_list_index(self, name):
-        for i, l in enumerate(self.lists):
-            if l.get_tasklist().get_title() == name:
-                return i
-        return None
+    def get_list_view(self, tasklist):
+        # TaskListView showing tasklist, None until refresh() added it
+        entry = self.views.get(tasklist)
+        if entry is None:
+            return None
+        return entry[1].get_tasklist()
+
+    def select_task(self, task_id):
+        # Scrolls to the task and focuses its row
+        task, tasklist = self.board.find_task(task_id)
+        if task is None:
+            return False
+        view = self.get_list_view(tasklist)
+        if view is None:
+            return False
+        view.select_task(tasklist.index_of(task))
+        return True
+
+    def restyle_tasks(self, task_ids, today):
+        # Only tasks which have a row are restyled, the others get their
+        # style when a row is created for them
+        for task_id in task_ids:
+            task, tasklist = self.board.find_task(task_id)
+            if task is None:
+                continue
+            view = self.get_list_view(tasklist)
+            row = None if view is None else view.get_row(task_id)
+            if row is not None:
+                row.restyle(today)
 
     def on_back_clicked(self, button):
         self.window.draw_boards_list()
@@ -117,17 +164,107 @@ class BoardView(Gtk.Box):
     def get_title(self):
         return self.board.title
 
+    def get_row_count(self):
+        return sum(len(l.get_tasklist().rows) for l in self.lists)
+
+    def present(self):
+        # Shows the view again after it was hidden in the window's stack.
+        # Its rows followed the model through its signals meanwhile.
+        self.window.set_titlebar(self.headerbar)
+        for l in self.lists:
+            row = l.get_tasklist().get_selected_row()
+            if row is not None:
+                row.grab_focus()
+                return
+
     def clear(self):
+        self.board.disconnect(self.list_handler)
+        self.window.due_dates.discard(self.due_index)
+        self.due_index.detach()
+        # Task rows go back to the window's pool instead of being destroyed
+        for l in self.lists:
+            l.get_tasklist().detach()
         for child in self.get_children():
             child.destroy()
         self.lists = []
+        self.views = dict()
 
+    @profiling.timed("BoardView.refresh")
     def refresh(self):
-        self.clear()
-        for l in self.board.tasklists:
-            self.add_tasklist_view(l)
-        if len(self.board.tasklists) > 0:
-            first_list = self.get_children()[0].get_tasklist()
-            first_elem = first_list.get_row_at_index(0)
-            first_list.select_row(first_elem)
-            first_elem.grab_focus()
+        # Adds views for lists which have none yet. The views of the other
+        # lists follow their tasks through the model signals.
+        views = {tasklist: l for tasklist, (position, l) in self.views.items()}
+        lists = []
+        self.views = dict()
+        for position, tasklist in enumerate(self.board.tasklists):
+            l = views.pop(tasklist, None)
+            if l is None:
+                l = self.add_tasklist_view(tasklist)
+            self.reorder_child(l, position)
+            lists.append(l)
+            self.views[tasklist] = (position, l)
+        for l in views.values():
+            l.get_tasklist().detach()
+        # Also drops the placeholder of the template on the first refresh
+        for child in self.get_children():
+            if child not in lists:
+                child.destroy()
+        self.lists = lists
+        selected = any(l.get_tasklist().get_selected_row() is not None for l in lists)
+        if len(lists) > 0 and not selected:
+            lists[0].get_tasklist().select_task(0)
+
+
+# Built board views are kept in the window's stack, so going back to a
+# recently used board only switches the visible child and keeps its scroll
+# positions and selection. The least recently used views are destroyed
+# when there are more than max_size of them or their task rows exceed
+# max_memory, and all hidden views when the system runs low on memory.
+BOARD_CACHE_MEMORY = 32 * 1024 * 1024
+
+
+class BoardViewCache:
+
+    def __init__(self, stack, max_size, max_memory=BOARD_CACHE_MEMORY):
+        self.stack = stack
+        self.max_size = max(1, max_size)
+        self.max_memory = max_memory
+        # title -> BoardView, least recently used first
+        self.views = OrderedDict()
+        # Gio.MemoryMonitor is available since GLib 2.64
+        if hasattr(Gio, "MemoryMonitor"):
+            self.monitor = Gio.MemoryMonitor.dup_default()
+            self.monitor.connect(
+                "low-memory-warning", lambda m, level: self.evict(1, 0))
+
+    def get(self, title, board):
+        view = self.views.get(title)
+        if view is None:
+            return None
+        if view.board is not board:
+            # The board was replaced, e.g. by a Trello import
+            self.discard(title)
+            return None
+        self.views.move_to_end(title)
+        return view
+
+    def add(self, title, view):
+        self.discard(title)
+        self.views[title] = view
+        self.stack.add(view)
+        self.evict(self.max_size, self.max_memory)
+
+    def discard(self, title):
+        view = self.views.pop(title, None)
+        if view is not None:
+            view.clear()
+            view.destroy()
+
+    def memory(self):
+        return sum(v.get_row_count() for v in self.views.values()) * ROW_MEMORY
+
+    def evict(self, max_size, max_memory):
+        # The most recently used view is kept in any case
+        while len(self.views) > 1 and \
+                (len(self.views) > max_size or self.memory() > max_memory):
+            self.discard(next(iter(self.views)))
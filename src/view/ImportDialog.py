@@ -0,0 +1,50 @@
+# ImportDialog.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+from gi.repository import Gtk
+
+
+# TODO use GtkTemplate
+class ImportDialog(Gtk.Dialog):
+
+    def __init__(self, window, filename):
+        super().__init__("Trello import", window, 0,
+                         (Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL),
+                         flags=Gtk.DialogFlags.MODAL)
+        box = self.get_content_area()
+        box.set_spacing(6)
+        box.set_margin_right(10)
+        box.set_margin_left(10)
+        self.label = Gtk.Label("Importing " + filename, xalign=0)
+        self.progressbar = Gtk.ProgressBar()
+        box.pack_start(self.label, False, False, 0)
+        box.pack_start(self.progressbar, False, False, 0)
+        self.show_all()
+
+    def set_fraction(self, fraction):
+        self.progressbar.set_fraction(fraction)
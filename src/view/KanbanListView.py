@@ -43,6 +43,7 @@ class KanbanListView(Gtk.Box):
         scrolled = Gtk.ScrolledWindow()
         scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
         scrolled.add(self.tasklist)
+        self.tasklist.track_adjustment(scrolled.get_vadjustment())
         self.pack_start(scrolled, True, True, 0)
 
     def get_tasklist(self):
@@ -0,0 +1,108 @@
+# QuickSwitcher.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+from gi.repository import Gtk, Gdk, Pango
+
+
+# TODO use GtkTemplate
+# Ctrl+K popover which fuzzy matches board names and task titles
+class QuickSwitcher(Gtk.Popover):
+
+    def __init__(self, window):
+        super().__init__(relative_to=window.get_titlebar())
+        self.window = window
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        box.set_margin_top(6)
+        box.set_margin_bottom(6)
+        box.set_margin_left(6)
+        box.set_margin_right(6)
+        self.entry = Gtk.SearchEntry(placeholder_text="Go to board or task")
+        self.entry.set_width_chars(40)
+        self.list = Gtk.ListBox()
+        self.list.set_selection_mode(Gtk.SelectionMode.BROWSE)
+        box.pack_start(self.entry, False, False, 0)
+        box.pack_start(self.list, True, True, 0)
+        self.add(box)
+
+        self.entry.connect("search-changed", lambda e: self.refresh())
+        self.entry.connect("activate", self.on_entry_activate)
+        self.entry.connect("key-press-event", self.on_entry_key_press)
+        self.list.connect("row-activated", self.on_row_activated)
+        self.connect("closed", lambda p: self.destroy())
+        box.show_all()
+
+    def refresh(self):
+        for child in self.list.get_children():
+            child.destroy()
+        for board, task_id, title in self.window.search.switch(self.entry.get_text()):
+            self.list.add(SwitcherRow(board, task_id, title))
+        self.list.show_all()
+        first = self.list.get_row_at_index(0)
+        if first is not None:
+            self.list.select_row(first)
+
+    def on_entry_key_press(self, entry, event):
+        # Up and down browse the results while the entry keeps the focus
+        name = Gdk.keyval_name(event.keyval)
+        if name not in ("Up", "Down"):
+            return False
+        row = self.list.get_selected_row()
+        if row is None:
+            return True
+        step = -1 if name == "Up" else 1
+        target = self.list.get_row_at_index(row.get_index() + step)
+        if target is not None:
+            self.list.select_row(target)
+        return True
+
+    def on_entry_activate(self, entry):
+        row = self.list.get_selected_row()
+        if row is not None:
+            self.on_row_activated(self.list, row)
+
+    def on_row_activated(self, listbox, row):
+        self.popdown()
+        if row.task_id is None:
+            self.window.draw_board(row.board)
+        else:
+            self.window.show_task(row.board, row.task_id)
+
+
+class SwitcherRow(Gtk.ListBoxRow):
+
+    def __init__(self, board, task_id, title):
+        super().__init__()
+        self.board = board
+        self.task_id = task_id
+        box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
+        label = Gtk.Label(title, xalign=0)
+        label.set_ellipsize(Pango.EllipsizeMode.END)
+        box.pack_start(label, True, True, 0)
+        if task_id is not None:
+            box.pack_end(Gtk.Label(board), False, False, 0)
+        self.add(box)
@@ -25,49 +25,58 @@
 # holders shall not be used in advertising or otherwise to promote the sale,
 # use or other dealings in this Software without prior written
 # authorization.
-
 import cairo
 import pickle
-from gi.repository import Gtk, GObject, Gdk
+from gi.repository import Gtk, Gdk
 from .TaskView import TaskView
 from .NewTask import NewTask
 from .Task import Task
+from . import profiling
 
-# TODO use GtkTemplate
-class TaskListView(Gtk.ListBox):
 
-    __gsignals__ = {
-        "modified": (GObject.SIGNAL_RUN_FIRST, None, ())
-    }
+# Rows are only created for a window of tasks around the visible part of
+# the list. Two spacer rows stand in for the tasks above and below the
+# window, so the scrollbar still covers the whole list.
+WINDOW_SIZE = 100
+# Height of a task row until the first rows were allocated
+ROW_HEIGHT = 40
 
-    handlers = []
 
+# TODO use GtkTemplate
+# The view edits the model only; rows follow through the list's signals,
+# so changes made elsewhere (importers, other views) show up as well.
+class TaskListView(Gtk.ListBox):
+
+    @profiling.timed("TaskListView.__init__")
     def __init__(self, tasklist, board):
         super().__init__()
         self.tasklist = tasklist
         self.connect("row-selected", self.on_row_selected)
         self.board = board
-        for t in tasklist.tasks:
-            task_view = TaskView(t, board)
-            self.set_drag_and_drop(task_view)
-            index = len(self.get_children())
-            h = []
-            h.append(task_view.connect("delete", self.on_task_delete))
-            h.append(task_view.connect("modified", self.on_task_modified))
-            self.handlers.append(h)
-            self.add(task_view)
-        new_task = NewTask()
-        new_task.connect("modified", lambda w, text: self.add_task(Task(text)))
-        self.add(new_task)
-        board.connect("task-move-up", lambda w, listname: self.move_up())
-        board.connect("task-move-down", lambda w, listname: self.move_down())
-        board.connect("task-move-top", lambda w, listname: self.move_top())
-        board.connect("task-move-bottom", lambda w,
-                      listname: self.move_bottom())
-        board.connect("task-move-left-top", lambda w,
-                      listname: self.move_to_prev_list(listname))
-        board.connect("task-move-right-top", lambda w,
-                      listname: self.move_to_next_list(listname))
+        # task id -> row and its signal handlers, for tasks with a row
+        self.rows = dict()
+        self.handlers = dict()
+        # tasklist.tasks[first:last] have rows
+        self.first = 0
+        self.last = 0
+        self.row_height = ROW_HEIGHT
+        self.measured = False
+        self.adjustment = None
+        # Task index to scroll to once the list is allocated
+        self.pending_scroll = None
+        self.top = self.new_spacer()
+        self.bottom = self.new_spacer()
+        self.add(self.top)
+        self.add(self.bottom)
+        self.new_task = NewTask()
+        self.new_task.connect(
+            "modified", lambda w, text: self.add_task(Task(text)))
+        self.add(self.new_task)
+        self.show_range(0, WINDOW_SIZE)
+        self.model_handlers = [
+            tasklist.connect("inserted", self.on_inserted),
+            tasklist.connect("removed", self.on_removed),
+            tasklist.connect("moved", self.on_moved)]
 
     def get_board(self):
         return self.board
@@ -75,6 +84,21 @@ class TaskListView(Gtk.ListBox):
     def get_title(self):
         return self.tasklist.title
 
+    def get_row(self, task_id):
+        return self.rows.get(task_id)
+
+    def connect_task(self, task_view):
+        task_id = task_view.task.id
+        self.rows[task_id] = task_view
+        self.handlers[task_id] = [
+            task_view.connect("delete", self.on_task_delete)]
+
+    def disconnect_task(self, task_view):
+        task_id = task_view.task.id
+        for h in self.handlers.pop(task_id):
+            task_view.disconnect(h)
+        del self.rows[task_id]
+
     def on_row_selected(self, task_list, task_view):
         if task_view is None:
             return
@@ -83,123 +107,248 @@ class TaskListView(Gtk.ListBox):
             if l.get_tasklist() is not task_list:
                 l.get_tasklist().unselect_all()
 
+    # Window of rows
+    def new_spacer(self):
+        spacer = Gtk.ListBoxRow()
+        spacer.set_selectable(False)
+        spacer.set_activatable(False)
+        spacer.set_can_focus(False)
+        spacer.set_no_show_all(True)
+        return spacer
+
+    def new_row(self, task):
+        task_view = self.board.window.task_views.acquire(task, self.board)
+        if task_view.target_entry is None:
+            self.set_drag_and_drop(task_view)
+        return task_view
+
+    def release_row(self, task_view):
+        self.board.window.task_views.release(task_view)
+
+    def release_rows(self):
+        self.hide_rows(self.first, self.last)
+        self.first = self.last = 0
+
+    def detach(self):
+        # Before the view is destroyed while its list stays on the board
+        for h in self.model_handlers:
+            self.tasklist.disconnect(h)
+        self.model_handlers = []
+        self.release_rows()
+
+    def track_adjustment(self, adjustment):
+        self.adjustment = adjustment
+        self.set_adjustment(adjustment)
+        adjustment.connect("value-changed", self.on_scroll)
+        adjustment.connect("changed", self.on_scroll)
+
+    def show_range(self, first, last):
+        tasks = self.tasklist.tasks
+        first = max(0, min(first, len(tasks)))
+        last = max(first, min(last, len(tasks)))
+        if first >= self.last or last <= self.first:
+            self.hide_rows(self.first, self.last)
+            self.first = self.last = first
+        else:
+            self.hide_rows(self.first, first)
+            self.hide_rows(last, self.last)
+            self.first = max(self.first, first)
+            self.last = min(self.last, last)
+        while self.first > first:
+            self.first -= 1
+            task_view = self.new_row(tasks[self.first])
+            self.connect_task(task_view)
+            self.insert(task_view, 1)
+        while self.last < last:
+            task_view = self.new_row(tasks[self.last])
+            self.connect_task(task_view)
+            self.insert(task_view, self.last - self.first + 1)
+            self.last += 1
+        self.update_spacers()
+
+    def hide_rows(self, start, end):
+        for task in self.tasklist.tasks[start:end]:
+            task_view = self.rows[task.id]
+            self.disconnect_task(task_view)
+            self.remove(task_view)
+            self.release_row(task_view)
+
+    def update_spacers(self):
+        above = self.first
+        below = len(self.tasklist.tasks) - self.last
+        self.top.set_size_request(-1, above * self.row_height)
+        self.top.set_visible(above > 0)
+        self.bottom.set_size_request(-1, below * self.row_height)
+        self.bottom.set_visible(below > 0)
+
+    def measure_rows(self):
+        # Spacers are sized from the first rows which were allocated
+        if self.measured or self.first == self.last:
+            return
+        rows = [self.rows[t.id] for t in self.tasklist.tasks[self.first:self.last]]
+        height = sum(r.get_allocated_height() for r in rows) / len(rows)
+        if height > 1:
+            self.row_height = height
+            self.measured = True
+            self.update_spacers()
+
+    def on_scroll(self, adjustment):
+        if self.pending_scroll is not None:
+            if adjustment.get_page_size() > 0:
+                index = self.pending_scroll
+                self.pending_scroll = None
+                self.scroll_to(index)
+            # Until then the value is clamped to 0, which would move the
+            # window back to the top
+            return
+        self.measure_rows()
+        value = adjustment.get_value()
+        top = int(value / self.row_height)
+        bottom = int((value + adjustment.get_page_size()) / self.row_height) + 1
+        margin = WINDOW_SIZE // 4
+        if (self.first > 0 and top - margin < self.first) or \
+                (self.last < len(self.tasklist.tasks) and bottom + margin > self.last):
+            size = max(WINDOW_SIZE, bottom - top + 2 * margin)
+            first = max(0, (top + bottom - size) // 2)
+            self.show_range(first, first + size)
+
+    def scroll_to(self, index):
+        if self.adjustment is None:
+            return
+        page = self.adjustment.get_page_size()
+        if page == 0:
+            # Not allocated yet, done from the first "changed" with a page
+            self.pending_scroll = index
+            return
+        self.adjustment.set_value(index * self.row_height - (page - self.row_height) / 2)
+
+    def get_task_index(self, task_view):
+        return self.first + task_view.get_index() - 1
+
+    def get_task_row(self, index):
+        # Creates rows around the task if it is outside of the window
+        if index >= len(self.tasklist.tasks):
+            return self.new_task
+        if not self.first <= index < self.last:
+            first = max(0, index - WINDOW_SIZE // 2)
+            self.show_range(first, first + WINDOW_SIZE)
+            self.scroll_to(index)
+        return self.rows[self.tasklist.tasks[index].id]
+
+    def get_selected_index(self):
+        task_view = self.get_selected_row()
+        if not isinstance(task_view, TaskView):
+            return None
+        return self.get_task_index(task_view)
+
+    def select_task(self, index):
+        row = self.get_task_row(index)
+        self.select_row(row)
+        row.grab_focus()
+
+    def place_task(self, index, task, task_view=None):
+        # The task was inserted at index into the model. Returns its row, or
+        # None if the task is outside of the window.
+        if self.first <= index <= self.last:
+            full = self.last - self.first >= WINDOW_SIZE
+            if full and index == self.last:
+                # The window does not grow, the task is left to the bottom
+                # spacer until it is scrolled to
+                if task_view is not None:
+                    self.release_row(task_view)
+                return None
+            if task_view is None:
+                task_view = self.new_row(task)
+            self.connect_task(task_view)
+            self.insert(task_view, index - self.first + 1)
+            self.last += 1
+            if full:
+                # Keeps the size of the window by dropping its last row
+                self.hide_rows(self.last - 1, self.last)
+                self.last -= 1
+            return task_view
+        if task_view is not None:
+            self.release_row(task_view)
+        if index < self.first:
+            self.first += 1
+            self.last += 1
+        return None
+
+    def forget_task(self, index, task):
+        # The task was removed from index of the model. Returns its row,
+        # detached from the list, if it had one.
+        task_view = None
+        if index < self.first:
+            self.first -= 1
+        elif index < self.last:
+            task_view = self.rows[task.id]
+            self.disconnect_task(task_view)
+            self.remove(task_view)
+        else:
+            return None
+        self.last -= 1
+        return task_view
+
+    # Model signals
+    def on_inserted(self, tasklist, task, index):
+        self.place_task(index, task)
+        self.update_spacers()
+
+    def on_removed(self, tasklist, task, index):
+        task_view = self.forget_task(index, task)
+        if task_view is not None:
+            self.release_row(task_view)
+        self.update_spacers()
+
+    def on_moved(self, tasklist, task, index, new_index):
+        self.place_task(new_index, task, self.forget_task(index, task))
+        self.update_spacers()
+
+    # Model changes
     def add_task(self, task):
-        task_view = TaskView(task, self.board)
-        self.set_drag_and_drop(task_view)
-        # insert before NewTask
-        self.insert_task(task_view, len(self.tasklist.tasks))
-        task_view.show_all()
-
-    def insert_task(self, task_view, index):
-        h = []
-        h.append(task_view.connect("delete", self.on_task_delete))
-        h.append(task_view.connect("modified", self.on_task_modified))
-        self.handlers.insert(index, h)
-        self.insert(task_view, index)
-        self.tasklist.insert(index, task_view.task)
-        self.emit("modified")
-
-    def remove_task(self, task_view):
-        index = task_view.get_index()
-        self.tasklist.remove(index)
-        for h in self.handlers[index]:
-            task_view.disconnect(h)
-        del self.handlers[index]
-        self.remove(task_view)
-        self.emit("modified")
+        self.tasklist.add(task)
+
+    def move_task(self, index, new_index):
+        self.tasklist.move(index, new_index)
+
+    def move_selected(self, index, new_index):
+        self.unselect_all()
+        self.move_task(index, new_index)
+        self.select_task(new_index)
 
     def move_up(self):
-        task = self.get_selected_row()
-        if task is None:
-            return
-        position = task.get_index()
-        if position > 0:
-            self.unselect_row(task)
-            self.remove_task(task)
-            self.insert_task(task, position - 1)
-            self.select_row(task)
-            task.grab_focus()
+        position = self.get_selected_index()
+        if position is not None and position > 0:
+            self.move_selected(position, position - 1)
 
     def move_down(self):
-        task = self.get_selected_row()
-        if task is None:
-            return
-        position = task.get_index()
-        if position < len(self.tasklist.tasks) - 1:
-            self.unselect_row(task)
-            self.remove_task(task)
-            self.insert_task(task, position + 1)
-            self.select_row(task)
-            task.grab_focus()
+        position = self.get_selected_index()
+        if position is not None and position < len(self.tasklist.tasks) - 1:
+            self.move_selected(position, position + 1)
 
     def move_top(self):
-        task = self.get_selected_row()
-        if task is None:
-            return
-        position = task.get_index()
-        if position > 0:
-            self.unselect_row(task)
-            self.remove_task(task)
-            self.insert_task(task, 0)
-            self.select_row(task)
-            task.grab_focus()
+        position = self.get_selected_index()
+        if position is not None and position > 0:
+            self.move_selected(position, 0)
 
     def move_bottom(self):
-        task = self.get_selected_row()
-        if task is None:
-            return
-        position = task.get_index()
+        position = self.get_selected_index()
         lastelem = len(self.tasklist.tasks) - 1
-        if position < lastelem:
-            self.unselect_row(task)
-            self.remove_task(task)
-            self.insert_task(task, lastelem)
-            self.select_row(task)
-            task.grab_focus()
-
-    def move_to_next_list(self, listname):
-        if self.get_title() != listname:
-            return
-        task = self.get_selected_row()
-        if task is None:
-            return
-        current_list_index = self.board.get_list_index(self.get_title())
-        if current_list_index + 1 >= len(self.board.lists):
-            return
-        next_list = self.board.get_list(current_list_index + 1).get_tasklist()
-        self.unselect_row(task)
-        self.remove_task(task)
-        next_list.insert_task(task, 0)
-        next_list.select_row(task)
-        task.grab_focus()
-
-    def move_to_prev_list(self, listname):
-        if self.get_title() != listname:
-            return
-        task = self.get_selected_row()
-        if task is None:
-            return
-        current_list_index = self.board.get_list_index(self.get_title())
-        if current_list_index == 0:
-            return
-        prev_list = self.board.get_list(current_list_index - 1).get_tasklist()
-        self.unselect_row(task)
-        self.remove_task(task)
-        prev_list.insert_task(task, 0)
-        prev_list.select_row(task)
-        task.grab_focus()
+        if position is not None and position < lastelem:
+            self.move_selected(position, lastelem)
 
-    def on_task_modified(self, widget, title):
-        self.emit("modified")
+    def move_to_list(self, target_list, index):
+        # Moves the task to the top of target_list, see BoardView.dispatch
+        self.unselect_all()
+        self.tasklist.transfer(index, target_list.tasklist, 0)
+        target_list.select_task(0)
 
     def on_task_delete(self, widget):
-        index = widget.get_index()
+        index = self.get_task_index(widget)
+        self.tasklist.remove(index)
         if index > 0:
             index -= 1
-        self.remove_task(widget)
-        row = self.get_row_at_index(index)
-        self.select_row(row)
-        row.grab_focus()
+        self.select_task(index)
 
     # Drag and Drop
     def set_drag_and_drop(self, task_view):
@@ -213,7 +362,11 @@ class TaskListView(Gtk.ListBox):
             task_view.target_entry], Gdk.DragAction.MOVE)
         task_view.connect("drag-data-received", self.on_drag_data_received)
 
-    def on_drag_begin(self, widget, drag_context):
+    # The handlers stay connected while a row moves between lists and
+    # boards, so they only use the widgets they are called with
+    @staticmethod
+    @profiling.timed("dnd drag-begin")
+    def on_drag_begin(widget, drag_context):
         row = widget.get_ancestor(TaskView)
         listbox = row.get_parent()
         listbox.select_row(row)
@@ -223,23 +376,37 @@ class TaskListView(Gtk.ListBox):
         row.draw(context)
         Gtk.drag_set_icon_surface(drag_context, surface)
 
-    def on_drag_data_received(self, widget, drag_context, x, y, data, info, time):
+    @staticmethod
+    @profiling.timed("dnd drag-data-received")
+    def on_drag_data_received(widget, drag_context, x, y, data, info, time):
         board = widget.get_ancestor(TaskListView).get_board()
         source_info = pickle.loads(data.get_data())
-        source_list_index = board.get_list_index(source_info["list"])
-        source_list = board.get_list(source_list_index).get_tasklist()
+        # The dragged card is found by id, whatever happened to the lists
+        # since the drag started
+        task, tasklist = board.board.find_task(source_info["task"])
+        if task is None:
+            return
+        source_list = board.get_list_view(tasklist)
+        source = None if source_list is None else source_list.get_row(task.id)
         target = widget
         target_list = target.get_ancestor(TaskListView)
-        if source_info["index"] == target.get_index() and source_info["list"] == target_list.get_title():
+        if source is target:
+            return
+        if source is None:
+            # Scrolled out of the window during the drag
+            index = tasklist.index_of(task)
+        else:
+            index = source_list.get_task_index(source)
+        position = target_list.get_task_index(target)
+        if tasklist is target_list.tasklist:
+            tasklist.move(index, position)
             return
-        source = source_list.get_row_at_index(source_info["index"])
-        position = target.get_index()
-        source_list.remove_task(source)
-        target_list.insert_task(source, position)
+        tasklist.transfer(index, target_list.tasklist, position)
 
-    def on_drag_data_get(self, widget, drag_context, data, info, time):
+    @staticmethod
+    @profiling.timed("dnd drag-data-get")
+    def on_drag_data_get(widget, drag_context, data, info, time):
         info = dict()
-        info["list"] = widget.get_ancestor(TaskListView).get_title()
-        info["index"] = widget.get_ancestor(TaskView).get_index()
+        info["task"] = widget.get_ancestor(TaskView).task.id
         data.set(Gdk.Atom.intern_static_string(
             "GTK_LIST_BOX_ROW"), 32, pickle.dumps(info))
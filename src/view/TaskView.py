@@ -26,10 +26,13 @@
 # use or other dealings in this Software without prior written
 # authorization.
 
-from gi.repository import Gtk, Gdk, GObject, Pango, GLib
-from .gi_composites import GtkTemplate
+import datetime
 
+from gi.repository import Gtk, Gdk, GObject, Pango, GLib, Gio
+from .gi_composites import GtkTemplate
 from .Task import Task
+from .due_dates import priority, PRIORITIES
+from . import profiling
 from .TextEntry import TextEntry, ActivableTextEntry
 
 #TODO use GtkTemplate
@@ -127,12 +130,12 @@ class TaskEditDialog(Gtk.Dialog):
 
     def on_response(self, widget, response):
         if response == Gtk.ResponseType.APPLY:
-            self.task.title = self.entry.get_text()
+            self.task.set_title(self.entry.get_text())
             y, m, d = self.calendar.get_date()
             if d != 0:
                 self.task.set_due_date(y, m + 1, d)
             else:
-                self.task.due_date = None
+                self.task.clear_due_date()
 
 
 @GtkTemplate(ui='/org/gnome/kanban/ui/task.ui')
@@ -140,7 +143,6 @@ class TaskView(Gtk.ListBoxRow):
     __gtype_name__ = 'TaskView'
 
     __gsignals__ = {
-        "modified": (GObject.SIGNAL_RUN_FIRST, None, (str,)),
         "delete": (GObject.SIGNAL_RUN_FIRST, None, ())
     }
 
@@ -154,41 +156,45 @@ class TaskView(Gtk.ListBoxRow):
     def __init__(self, task, board):
         super().__init__()
         self.init_template()
-        self.task = task
-        self.connect("modified", lambda widget,
-                     title: self.task.set_title(title))
+        # Set up once by the first list which shows the row
+        self.target_entry = None
         self.connect("key-press-event", self.on_key_press)
         self.editbutton.connect("clicked", self.on_edit_clicked)
         self.deletebutton.connect("clicked", lambda w: self.emit("delete"))
-        self.refresh()
+        self.bind(task)
 
     def refresh(self):
         task = self.task
+        due = task.get_due_ordinal()
         # entry
         self.label.set_text(task.title)
         # due date
-        sc = self.get_style_context()
-        sc.remove_class("priority-low")
-        sc.remove_class("priority-medium")
-        sc.remove_class("priority-high")
-        if hasattr(task, "due_date") and task.due_date is not None:
-            date = GLib.DateTime.new_local(
-                task.due_date.year, task.due_date.month, task.due_date.day, 0, 0, 0)
-            self.due_date.set_text(date.format("%e %b"))
-            todaytime = GLib.DateTime.new_now_local()
-            timediff = date.difference(todaytime) / (24 * 60 * 60 * 1000000)
-            if timediff < 1:
-                sc.add_class("priority-high")
-            elif timediff < 2:
-                sc.add_class("priority-medium")
-            elif timediff < 3:
-                sc.add_class("priority-low")
+        if due != 0:
+            self.due_date.set_text(datetime.date.fromordinal(due).strftime("%e %b"))
         else:
             self.due_date.set_text("")
+        self.restyle(datetime.date.today().toordinal())
         self.show_all()
 
-    def on_modified(self, widget, title):
-        self.emit("modified", title)
+    def restyle(self, today):
+        # Called by the due date scheduler when the day changed
+        sc = self.get_style_context()
+        style = priority(self.task.get_due_ordinal(), today)
+        for name in PRIORITIES.values():
+            if name != style:
+                sc.remove_class(name)
+        if style is not None:
+            sc.add_class(style)
+
+    def bind(self, task):
+        # The row follows changes of its task, whoever makes them
+        self.task = task
+        self.task_handler = task.connect("updated", lambda t: self.refresh())
+        self.refresh()
+
+    def unbind(self):
+        self.task.disconnect(self.task_handler)
+        self.task = None
 
     # Edit
     def on_key_press(self, widget, event):
@@ -202,8 +208,53 @@ class TaskView(Gtk.ListBoxRow):
 
     def on_edit_clicked(self, button):
         dialog = TaskEditDialog(self.get_ancestor(Gtk.Window), self.task)
-        response = dialog.run()
-        if response == Gtk.ResponseType.APPLY:
-            self.emit("modified", self.task.title)
-            self.refresh()
+        dialog.run()
         dialog.destroy()
+
+
+# Rows taken out of a list are kept for the next list which needs rows;
+# rebinding a row is much cheaper than building it from the template.
+# The pool is bounded by a number of rows and by an estimate of their
+# memory, and is emptied when the system runs low on memory.
+POOL_SIZE = 500
+POOL_MEMORY = 16 * 1024 * 1024
+# Rough size of a TaskView with its child widgets
+ROW_MEMORY = 24 * 1024
+
+
+class TaskViewPool:
+
+    def __init__(self, max_size=POOL_SIZE, max_memory=POOL_MEMORY):
+        self.max_size = min(max_size, max_memory // ROW_MEMORY)
+        self.rows = []
+        self.created = 0
+        self.reused = 0
+        # Gio.MemoryMonitor is available since GLib 2.64
+        if hasattr(Gio, "MemoryMonitor"):
+            self.monitor = Gio.MemoryMonitor.dup_default()
+            self.monitor.connect(
+                "low-memory-warning", lambda m, level: self.clear())
+
+    def acquire(self, task, board):
+        if len(self.rows) > 0:
+            self.reused += 1
+            profiling.count("rows reused")
+            task_view = self.rows.pop()
+            task_view.bind(task)
+            return task_view
+        self.created += 1
+        profiling.count("rows created")
+        return TaskView(task, board)
+
+    def release(self, task_view):
+        # The row must already be removed from its list
+        task_view.unbind()
+        if len(self.rows) >= self.max_size:
+            task_view.destroy()
+            return
+        self.rows.append(task_view)
+
+    def clear(self):
+        for task_view in self.rows:
+            task_view.destroy()
+        self.rows = []
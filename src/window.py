@@ -29,9 +29,12 @@
 from gi.repository import Gtk, Gio, GLib
 from .gi_composites import GtkTemplate
 
-from .BoardView import BoardView
-from .BoardListView import BoardListView
-from .settings import KanbanSettings
+from .BoardView import BoardView, BoardViewCache
+from .TaskView import TaskViewPool
+from . import profiling
+from .settings import KanbanSettings, AutosaveScheduler, GeometryWriter, create_storage
+from .search import SearchIndex
+from .due_dates import DueScheduler
 
 
 @GtkTemplate(ui='/org/gnome/kanban/ui/window.ui')
@@ -45,32 +48,73 @@ class KanbanWindow(Gtk.ApplicationWindow):
         self.accelerators = Gtk.AccelGroup()
         self.add_accel_group(self.accelerators)
         self.settings = Gio.Settings.new("org.gnome.kanban")
-        self.connect("configure-event", lambda w, e: self.save_window_info())
-        self.user_settings = KanbanSettings(config_dir)
+        self.geometry = GeometryWriter(
+            self.save_window_info, GLib.timeout_add, GLib.source_remove)
+        self.connect("configure-event", lambda w, e: self.geometry.update(self.get_geometry()))
+        storage = create_storage(
+            self.settings.get_string("storage"), config_dir, migrate=True)
+        self.user_settings = KanbanSettings(config_dir, storage, lazy=True)
+        self.autosave = AutosaveScheduler(
+            self.user_settings, GLib.timeout_add, GLib.source_remove)
+        self.task_views = TaskViewPool()
+        self.due_dates = DueScheduler(GLib.timeout_add_seconds, GLib.source_remove)
+        self.search = SearchIndex(self.user_settings)
+        # The stack replaces the placeholder box of the template
+        self.get_child().destroy()
+        self.boards_list = None
+        self.stack = Gtk.Stack()
+        self.add(self.stack)
+        self.board_views = BoardViewCache(
+            self.stack, self.settings.get_int("board-cache-size"))
         self.load_settings()
 
     def draw_boards_list(self):
+        # Only imported when needed, startup usually goes to a board
+        from .BoardListView import BoardListView
         self.clean()
         blv = BoardListView(self.user_settings, self)
-        self.add(blv)
+        self.stack.add(blv)
+        self.boards_list = blv
         self.active_board = ""
         self.show_all()
+        self.stack.set_visible_child(blv)
         if len(blv.list.get_children()) > 0:
             first_elem = blv.list.get_children()[0]
             blv.list.select_row(first_elem)
             first_elem.grab_focus()
 
+    @profiling.timed("KanbanWindow.draw_board")
     def draw_board(self, name):
         self.clean()
-        boardview = BoardView(self.user_settings.boards[name], self)
-        self.add(boardview)
+        board = self.user_settings.boards[name]
+        boardview = self.board_views.get(name, board)
+        if boardview is None:
+            boardview = BoardView(board, self)
+            self.board_views.add(name, boardview)
         self.active_board = name
         self.show_all()
+        self.stack.set_visible_child(boardview)
+        boardview.present()
+        return boardview
+
+    def show_task(self, title, task_id):
+        # Jumps to a task found by the search
+        if title not in self.user_settings.boards:
+            return
+        boardview = self.draw_board(title)
+        boardview.select_task(task_id)
+
+    def show_quick_switcher(self):
+        from .QuickSwitcher import QuickSwitcher
+        switcher = QuickSwitcher(self)
+        switcher.popup()
+        switcher.entry.grab_focus()
 
     def clean(self):
-        child = self.get_child()
-        if child is not None:
-            child.destroy()
+        # Board views stay in the stack, only the board list is rebuilt
+        if self.boards_list is not None:
+            self.boards_list.destroy()
+            self.boards_list = None
 
     def bind_accelerator(self, widget, accelerator, signal='clicked'):
         key, mod = Gtk.accelerator_parse(accelerator)
@@ -89,19 +133,27 @@ class KanbanWindow(Gtk.ApplicationWindow):
         else:
             self.unmaximize()
         # Get boards settings
+        profiling.mark("window")
         self.user_settings.load()
+        profiling.mark("settings load")
+        # Boards which are not opened are indexed while the app is idle
+        self.search.add_titles()
+        GLib.idle_add(self.search.index_next)
         board = self.settings.get_string("selected-board")
         if board != "" and board in self.user_settings.boards:
             self.draw_board(board)
         else:
             self.draw_boards_list()
+        profiling.mark("first view")
+
+    def get_geometry(self):
+        # Only asks the window, GSettings is written by self.geometry
+        return (self.is_maximized(), self.get_size(), self.get_position())
 
-    def save_window_info(self):
-        self.settings.set_boolean("window-maximized", self.is_maximized())
-        w, h = self.get_size()
-        self.settings.set_value("window-size", GLib.Variant("ai", [w, h]))
-        x, y = self.get_position()
-        self.settings.set_value("window-position", GLib.Variant("ai", [x, y]))
+    def save_window_info(self, maximized, size, position):
+        self.settings.set_boolean("window-maximized", maximized)
+        self.settings.set_value("window-size", GLib.Variant("ai", list(size)))
+        self.settings.set_value("window-position", GLib.Variant("ai", list(position)))
 
     def save_board_info(self):
         print("save board", self.active_board)
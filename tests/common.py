@@ -0,0 +1,90 @@
+# common.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+
+
+# meson installs every source file into a single 'kanban' package directory;
+# mirror that layout so the modules' relative imports resolve
+def import_kanban():
+    if "kanban" in sys.modules:
+        return
+    src = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+    root = tempfile.mkdtemp(prefix="kanban-test-")
+    atexit.register(shutil.rmtree, root, True)
+    package = os.path.join(root, "kanban")
+    os.mkdir(package)
+    for dirpath, dirnames, filenames in os.walk(os.path.abspath(src)):
+        for filename in filenames:
+            if filename.endswith(".py"):
+                os.symlink(os.path.join(dirpath, filename),
+                           os.path.join(package, filename))
+    sys.path.insert(0, root)
+
+
+def make_config_dir(test):
+    # Storage classes join paths by concatenation
+    config_dir = tempfile.mkdtemp(prefix="kanban-test-")
+    test.addCleanup(shutil.rmtree, config_dir, True)
+    return config_dir + os.sep
+
+
+def make_board(Board, title="Work"):
+    board = Board(title)
+    for name in ("Todo", "Done"):
+        tasklist = board.add_new(name)
+        for i in range(5):
+            tasklist.add_new("%s %d" % (name, i))
+    board.mark_saved()
+    return board
+
+
+def edit_board(board):
+    # One change of every kind the storage backends persist incrementally
+    todo, done = board.tasklists
+    todo.insert(1, type(todo.tasks[0])("inserted"))
+    todo.remove(3)
+    todo.move(0, 4)
+    todo.transfer(2, done, 0)
+    done.rebalance()
+    task = done.tasks[1]
+    task.set_field("description", "with a field")
+    task.set_title("updated")
+    todo.tasks[0].set_due_date(2024, 2, 29)
+    later = board.add_new("Later")
+    later.add_new("in a new list")
+
+
+def board_state(board):
+    return [(l.title, [(t.id, t.order, t.title, t.get_due_ordinal(),
+                        t.get_field("description")) for t in l.tasks])
+            for l in board.tasklists]
@@ -0,0 +1,97 @@
+# test_cli.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import os
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+
+from common import import_kanban, make_config_dir
+
+import_kanban()
+from kanban import cli
+from kanban.Board import Board
+from kanban.json_storage import JsonStorage
+from kanban.settings import create_storage
+
+
+def run(config_dir, *argv):
+    # Returns (exit status, stdout, stderr)
+    out, err = StringIO(), StringIO()
+    with redirect_stdout(out), redirect_stderr(err):
+        status = cli.main(["--config-dir", config_dir] + list(argv))
+    return status, out.getvalue(), err.getvalue()
+
+
+class TestBackends(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dir = make_config_dir(self)
+        board = Board("Work")
+        board.add_new("Backlog").add_new("first")
+        with redirect_stdout(StringIO()):
+            JsonStorage(self.config_dir).save_board(board)
+
+    def test_other_backend_is_refused(self):
+        status, out, err = run(self.config_dir, "--storage", "sqlite", "list")
+        self.assertEqual(status, 1)
+        self.assertIn("json backend", err)
+        self.assertEqual(os.listdir(self.config_dir), ["Work.json"])
+
+    def test_stored_backend_is_used(self):
+        status, out, err = run(self.config_dir, "list")
+        self.assertEqual(status, 0)
+        self.assertEqual(out.split("\t")[-1], "first\n")
+        with redirect_stdout(StringIO()):
+            create_storage("sqlite", self.config_dir, migrate=True).close()
+        status, out, err = run(self.config_dir, "list")
+        self.assertEqual(status, 0)
+        self.assertEqual(out.split("\t")[-1], "first\n")
+
+    def test_both_backends_need_a_choice(self):
+        with redirect_stdout(StringIO()):
+            create_storage("sqlite", self.config_dir).list_boards()
+        status, out, err = run(self.config_dir, "list")
+        self.assertEqual(status, 1)
+        status, out, err = run(self.config_dir, "--storage", "json", "list")
+        self.assertEqual(status, 0)
+
+
+class TestEmptyConfiguration(unittest.TestCase):
+
+    def test_list_reports_no_boards(self):
+        config_dir = make_config_dir(self)
+        status, out, err = run(config_dir, "list")
+        self.assertEqual(status, 1)
+        self.assertEqual(out, "")
+        self.assertIn("no boards", err)
+        self.assertEqual(os.listdir(config_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
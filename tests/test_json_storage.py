@@ -0,0 +1,192 @@
+# test_json_storage.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import io
+import os
+import sys
+import json
+import types
+import pickle
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from common import import_kanban, make_config_dir, make_board, edit_board, board_state
+
+import_kanban()
+from kanban.Board import Board
+from kanban.Task import Task
+from kanban.json_storage import JsonStorage, BoardEncoder, stream_board
+
+
+def legacy_model():
+    # Classes of the first releases, pickled from a 'model' package
+    class DueDate:
+        def __init__(self, year, month, day):
+            self.year = year
+            self.month = month
+            self.day = day
+
+    class Task:
+        def __init__(self, title):
+            self.title = title
+            self.creation_date = 1500000000.0
+            self.update_date = self.creation_date
+            self.due_date = None
+
+    class TaskList:
+        def __init__(self, title):
+            self.title = title
+            self.tasks = []
+
+    class Board:
+        def __init__(self, title):
+            self.title = title
+            self.tasklists = dict()
+
+    modules = dict()
+    for cls in (DueDate, Task, TaskList, Board):
+        name = "model." + (cls.__name__ if cls is not DueDate else "Task")
+        module = modules.setdefault(name, types.ModuleType(name))
+        cls.__module__ = name
+        cls.__qualname__ = cls.__name__
+        setattr(module, cls.__name__, cls)
+    modules["model"] = types.ModuleType("model")
+    return modules
+
+
+def write_legacy_board(path):
+    modules = legacy_model()
+    saved = {name: sys.modules.get(name) for name in modules}
+    sys.modules.update(modules)
+    try:
+        Task = modules["model.Task"].Task
+        board = modules["model.Board"].Board("Old")
+        for title in "Backlog Ready Doing Done".split():
+            board.tasklists[title] = modules["model.TaskList"].TaskList(title)
+        ready = board.tasklists["Ready"]
+        for title in ("first", "second"):
+            ready.tasks.append(Task(title))
+        ready.tasks[1].due_date = modules["model.Task"].DueDate(2018, 5, 6)
+        with open(path, "wb") as f:
+            pickle.dump(board, f)
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                del sys.modules[name]
+            else:
+                sys.modules[name] = module
+
+
+class TestLegacyConfiguration(unittest.TestCase):
+
+    def test_convert_pkl(self):
+        config_dir = make_config_dir(self)
+        write_legacy_board(config_dir + "Old.pkl")
+        storage = JsonStorage(config_dir)
+        with redirect_stdout(StringIO()):
+            self.assertEqual(storage.list_boards(), ["Old"])
+            board = JsonStorage(config_dir).load_board("Old")
+        self.assertFalse(os.path.exists(config_dir + "Old.json.tmp"))
+        self.assertEqual([l.title for l in board.tasklists],
+                         "Backlog Ready Doing Done".split())
+        tasks = board.tasklists[1].tasks
+        self.assertEqual([t.title for t in tasks], ["first", "second"])
+        self.assertLess(tasks[0].order, tasks[1].order)
+        self.assertIsNone(tasks[0].due_date)
+        due = tasks[1].due_date
+        self.assertEqual((due.year, due.month, due.day), (2018, 5, 6))
+        self.assertIs(board.find_task(tasks[0].id)[0], tasks[0])
+
+
+class TestStreamBoard(unittest.TestCase):
+
+    def test_round_trip(self):
+        board = Board("Work")
+        for title in ("Todo", "Done"):
+            tasklist = board.add_new(title)
+            for i in range(50):
+                task = tasklist.add_new("%s %d" % (title, i))
+                if i % 7 == 0:
+                    task.set_due_date(2024, 1 + i % 12, 1 + i % 28)
+                    task.set_field("labels", [{"name": "x", "color": "red"}])
+        board.tasklists[1].tasks[3].set_field("description", "d")
+        data = json.dumps(board, cls=BoardEncoder)
+        loaded, version = stream_board(io.StringIO(data))
+        self.assertEqual(json.dumps(loaded, cls=BoardEncoder), data)
+        self.assertIs(loaded.find_task(board.tasklists[1].tasks[3].id)[0],
+                      loaded.tasklists[1].tasks[3])
+
+    def test_version_1(self):
+        data = {"title": "Old", "tasklists": [{"title": "Todo", "tasks": [
+            {"title": "a", "creation_date": 1.0, "update_date": 1.0, "due_date": None},
+            {"title": "b", "creation_date": 2.0, "update_date": 3.0,
+             "due_date": {"year": 2018, "month": 2, "day": 3}}]}]}
+        board, version = stream_board(io.StringIO(json.dumps(data)))
+        self.assertEqual(version, 1)
+        a, b = board.tasklists[0].tasks
+        self.assertLess(a.order, b.order)
+        self.assertEqual(b.due_date.day, 3)
+
+    def test_newer_version(self):
+        data = json.dumps({"version": 99, "title": "New", "tasklists": []})
+        with self.assertRaises(ValueError):
+            stream_board(io.StringIO(data))
+
+
+class TestJournal(unittest.TestCase):
+
+    def test_replay(self):
+        config_dir = make_config_dir(self)
+        storage = JsonStorage(config_dir, journal=True)
+        board = make_board(Board)
+        with redirect_stdout(StringIO()):
+            storage.save_board(board)
+            edit_board(board)
+            storage.save_board(board)
+            self.assertTrue(os.path.exists(config_dir + "Work.journal"))
+            loaded = JsonStorage(config_dir).load_board("Work")
+        self.assertEqual(board_state(loaded), board_state(board))
+        self.assertFalse(loaded.is_modified())
+
+    def test_torn_entry(self):
+        config_dir = make_config_dir(self)
+        storage = JsonStorage(config_dir, journal=True)
+        board = make_board(Board)
+        with redirect_stdout(StringIO()):
+            storage.save_board(board)
+            board.tasklists[0].move(0, 2)
+            storage.save_board(board)
+            with open(config_dir + "Work.journal", "a") as f:
+                f.write('{"op": "remove", "li')
+            loaded = JsonStorage(config_dir).load_board("Work")
+        self.assertEqual(board_state(loaded), board_state(board))
+
+
+if __name__ == "__main__":
+    unittest.main()
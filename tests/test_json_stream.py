@@ -0,0 +1,79 @@
+# test_json_stream.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import io
+import json
+import unittest
+
+from common import import_kanban
+
+import_kanban()
+from kanban.json_stream import JsonStream
+
+
+DOCUMENT = {
+    "name": "export",
+    "lists": [{"id": "l1", "name": "Todo"}, {"id": "l2", "name": "Done"}],
+    "actions": [{"type": "move", "data": [1, 2, {"x": None}]}] * 3,
+    "cards": [123456789012, -0.5e-3, "café \"quoted\"", True, None, [], {}, 7],
+}
+
+
+class TestJsonStream(unittest.TestCase):
+
+    def test_every_chunk_size(self):
+        for indent in (None, 2):
+            text = json.dumps(DOCUMENT, indent=indent)
+            for chunk_size in range(1, 40):
+                stream = JsonStream(io.StringIO(text), chunk_size=chunk_size)
+                items = list(stream.iter_items("lists", "cards"))
+                self.assertEqual(items, [("lists", v) for v in DOCUMENT["lists"]] +
+                                 [("cards", v) for v in DOCUMENT["cards"]], chunk_size)
+
+    def test_members_and_elements(self):
+        text = json.dumps({"a": [{"b": [1, 2]}, {"b": [3]}], "c": 4})
+        stream = JsonStream(io.StringIO(text), chunk_size=3)
+        result = []
+        for name in stream.iter_members():
+            if name == "a":
+                for i in stream.iter_elements():
+                    for inner in stream.iter_members():
+                        result.append((i, inner, list(stream.iter_array())))
+            else:
+                result.append((name, stream.decode_value()))
+        self.assertEqual(result, [(0, "b", [1, 2]), (1, "b", [3]), ("c", 4)])
+
+    def test_truncated_document(self):
+        for text in ('{"cards": [1, 2', '{"cards": [{"a": 1}', '{"cards": ["abc'):
+            stream = JsonStream(io.StringIO(text), chunk_size=4)
+            with self.assertRaises(ValueError):
+                list(stream.iter_items("cards"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+# test_order_keys.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import random
+import unittest
+
+from common import import_kanban
+
+import_kanban()
+from kanban.order_keys import key_between, fits, spread_keys
+from kanban.TaskList import TaskList, MAX_KEY_LENGTH
+
+
+class TestKeyBetween(unittest.TestCase):
+
+    def test_ends(self):
+        key = key_between(None, None)
+        after = key_between(key, None)
+        before = key_between(None, key)
+        self.assertLess(before, key)
+        self.assertLess(key, after)
+
+    def test_same_spot(self):
+        # Repeated inserts right after the same key
+        before, after = "a0", "a1"
+        for i in range(200):
+            key = key_between(before, after)
+            self.assertTrue(fits(key, before, after))
+            after = key
+
+    def test_random_inserts(self):
+        rnd = random.Random(1)
+        keys = []
+        for i in range(2000):
+            index = rnd.randint(0, len(keys))
+            before = keys[index - 1] if index > 0 else None
+            after = keys[index] if index < len(keys) else None
+            keys.insert(index, key_between(before, after))
+        self.assertEqual(keys, sorted(set(keys)))
+
+    def test_wrong_order(self):
+        with self.assertRaises(ValueError):
+            key_between("a1", "a0")
+        with self.assertRaises(ValueError):
+            key_between("a0", "a0")
+
+
+class TestSpreadKeys(unittest.TestCase):
+
+    def test_sorted_and_short(self):
+        keys = spread_keys(100000)
+        self.assertEqual(keys, sorted(set(keys)))
+        self.assertLessEqual(max(len(k) for k in keys), 4)
+
+    def test_rebalance(self):
+        tasklist = TaskList("Todo")
+        for i in range(10):
+            tasklist.add_new("Task %d" % i)
+        for i in range(200):
+            tasklist.insert(1, type(tasklist.tasks[0])("Front %d" % i))
+        keys = [t.order for t in tasklist.tasks]
+        self.assertEqual(keys, sorted(set(keys)))
+        self.assertLessEqual(max(len(k) for k in keys), MAX_KEY_LENGTH)
+
+
+if __name__ == "__main__":
+    unittest.main()
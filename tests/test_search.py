@@ -0,0 +1,73 @@
+# test_search.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import unittest
+
+from common import import_kanban
+
+import_kanban()
+from kanban.search import TrigramIndex, CANDIDATE_FACTOR
+
+
+class TestTrigramIndex(unittest.TestCase):
+
+    def test_shorter_title_ranks_first(self):
+        index = TrigramIndex()
+        index.add(1, "release notes for the new version")
+        index.add(2, "release notes")
+        self.assertEqual([k for k, t in index.search("release note", 10)], [2, 1])
+
+    def test_score_counts_trigrams(self):
+        # Repeated words add characters but no trigrams
+        index = TrigramIndex()
+        index.add(1, "aaab")
+        index.add(2, "aaaa aaaa aaaa aaaa")
+        self.assertEqual(index.search("aaaa", 10)[0], (2, "aaaa aaaa aaaa aaaa"))
+
+    def test_renamed_titles_do_not_hide_matches(self):
+        index = TrigramIndex()
+        limit = 2
+        for i in range(1000):
+            index.add(("other", i), "groceries %d" % i)
+        for i in range(limit * CANDIDATE_FACTOR * 2):
+            index.add(i, "budget review %d" % i)
+        # Stale entries of the old titles stay in the postings
+        for i in range(limit * CANDIDATE_FACTOR * 2):
+            index.add(i, "archived %d" % i)
+        index.add("live", "budget review")
+        self.assertEqual(index.search("budget review", limit), [("live", "budget review")])
+
+    def test_no_match(self):
+        index = TrigramIndex()
+        index.add(1, "groceries")
+        self.assertEqual(index.search("zzz", 10), [])
+        self.assertEqual(index.search("g", 10), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+# test_sqlite_storage.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from common import import_kanban, make_config_dir, make_board, edit_board, board_state
+
+import_kanban()
+from kanban.Board import Board
+from kanban.sqlite_storage import SqliteStorage
+
+
+class TestIncrementalSave(unittest.TestCase):
+
+    def test_apply_changes(self):
+        config_dir = make_config_dir(self)
+        storage = SqliteStorage(config_dir)
+        self.addCleanup(storage.close)
+        board = make_board(Board)
+        with redirect_stdout(StringIO()):
+            storage.save_board(board)
+        board.mark_saved()
+        edit_board(board)
+
+        def write_board(board):
+            self.fail("%s was written again" % board.title)
+
+        storage.write_board = write_board
+        storage.save_board(board)
+        reader = SqliteStorage(config_dir)
+        self.addCleanup(reader.close)
+        self.assertEqual(board_state(reader.load_board("Work")), board_state(board))
+
+    def test_insert_from_other_board(self):
+        config_dir = make_config_dir(self)
+        storage = SqliteStorage(config_dir)
+        self.addCleanup(storage.close)
+        source = make_board(Board, "Source")
+        target = make_board(Board, "Target")
+        with redirect_stdout(StringIO()):
+            storage.save_board(source)
+            storage.save_board(target)
+        source.mark_saved()
+        target.mark_saved()
+        # Saved in the order the windows happen to be saved
+        task = source.tasklists[0].tasks[0]
+        source.tasklists[0].remove(0)
+        target.tasklists[1].insert(0, task)
+        storage.save_board(target)
+        storage.save_board(source)
+        self.assertEqual(board_state(storage.load_board("Target")), board_state(target))
+        self.assertEqual(board_state(storage.load_board("Source")), board_state(source))
+
+
+if __name__ == "__main__":
+    unittest.main()
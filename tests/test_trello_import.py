@@ -0,0 +1,150 @@
+# test_trello_import.py
+#
+# Copyright (C) 2018 Pawel Jakubowski
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE X CONSORTIUM BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of the above copyright
+# holders shall not be used in advertising or otherwise to promote the sale,
+# use or other dealings in this Software without prior written
+# authorization.
+
+import gc
+import os
+import json
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from common import import_kanban, make_config_dir
+
+import_kanban()
+from kanban import trello_importer
+from kanban.settings import KanbanSettings, AutosaveScheduler
+from kanban.json_storage import JsonStorage
+
+
+class MainLoop:
+    # idle_add and timeout_add of a main loop which is run by hand
+
+    def __init__(self):
+        self.idle = []
+        self.timeouts = dict()
+        self.next_id = 1
+
+    def idle_add(self, func, *args):
+        self.idle.append((func, args))
+
+    def timeout_add(self, delay, func):
+        source = self.next_id
+        self.next_id += 1
+        self.timeouts[source] = func
+        return source
+
+    def source_remove(self, source):
+        del self.timeouts[source]
+
+    def iterate(self):
+        func, args = self.idle.pop(0)
+        if func(*args):
+            self.idle.append((func, args))
+
+
+def write_export(path, cards):
+    data = {"lists": [{"id": "l1", "name": "Todo"}],
+            "cards": [{"name": "card %d" % i, "desc": "", "due": None, "labels": [],
+                       "idList": "l1", "closed": False} for i in range(cards)]}
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+class TestTrelloImport(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dir = make_config_dir(self)
+        self.loop = MainLoop()
+        self.settings = KanbanSettings(self.config_dir, JsonStorage(self.config_dir), lazy=True)
+        self.autosave = AutosaveScheduler(
+            self.settings, self.loop.timeout_add, self.loop.source_remove)
+
+    def run_import(self, cards):
+        path = self.config_dir + "export.json"
+        write_export(path, cards)
+        job = trello_importer.TrelloImport(
+            self.settings, self.autosave, path, self.loop.idle_add, batch_size=10)
+        done = []
+        job.on_done = done.append
+        calls = 0
+        with redirect_stdout(StringIO()):
+            job.start()
+            while len(done) == 0:
+                if len(self.loop.idle) == 0:
+                    job.thread.join(0.01)
+                    continue
+                self.loop.iterate()
+                calls += 1
+        return done[0], calls
+
+    def test_batches_are_split_by_time(self):
+        apply_time = trello_importer.APPLY_TIME
+        trello_importer.APPLY_TIME = 0
+        self.addCleanup(setattr, trello_importer, "APPLY_TIME", apply_time)
+        error, calls = self.run_import(25)
+        self.assertIsNone(error)
+        # One list and 25 cards, one at a time, after the calls which
+        # queue the 3 batches
+        self.assertEqual(calls, 3 + 26)
+        tasks = self.settings.boards["Work"].tasklists[0].tasks
+        self.assertEqual([t.title for t in tasks], ["card %d" % i for i in range(25)])
+
+    def test_held_board_does_not_arm_autosave(self):
+        error, calls = self.run_import(25)
+        self.assertIsNone(error)
+        # Only the save after the import
+        self.assertEqual(len(self.loop.timeouts), 1)
+        self.assertEqual(self.loop.next_id, 2)
+        with redirect_stdout(StringIO()):
+            self.loop.timeouts.popitem()[1]()
+        self.assertTrue(os.path.exists(self.config_dir + "Work.json"))
+
+    def test_cancel(self):
+        path = self.config_dir + "export.json"
+        write_export(path, 25)
+        job = trello_importer.TrelloImport(
+            self.settings, self.autosave, path, self.loop.idle_add, batch_size=10)
+        done = []
+        job.on_done = done.append
+        with redirect_stdout(StringIO()):
+            job.start()
+            while len(self.loop.idle) == 0:
+                job.thread.join(0.01)
+            self.loop.iterate()
+            job.cancel()
+            job.thread.join()
+            while len(self.loop.idle) > 0:
+                self.loop.iterate()
+        self.assertEqual(done, ["Import cancelled"])
+        self.assertTrue(gc.isenabled())
+        self.assertNotIn("Work", self.settings.boards)
+        self.assertEqual(len(self.loop.timeouts), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()